@@ -1,6 +1,11 @@
 import aiohttp
+import asyncio
+import email.utils
+import random
 import requests
 import logging
+import time
+from urllib.parse import urlparse
 
 # Logger einrichten
 logger = logging.getLogger("APIClientLogger")
@@ -10,65 +15,224 @@ formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
 handler.setFormatter(formatter)
 logger.addHandler(handler)
 
+# Statuscodes, bei denen ein erneuter Versuch sinnvoll ist (Überlastung oder Serverfehler)
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class CircuitBreaker:
+    """Sperrt einen Host nach zu vielen aufeinanderfolgenden Fehlern für eine Abkühlzeit."""
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+
+    @property
+    def is_open(self):
+        """True, solange die Abkühlzeit nach dem Auslösen noch läuft."""
+        if self.opened_at is None:
+            return False
+        return time.monotonic() - self.opened_at < self.reset_timeout
+
+    def allow_request(self):
+        """Nach Ablauf der Abkühlzeit sind Probe-Anfragen wieder erlaubt (half-open)."""
+        return not self.is_open
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.failures >= self.failure_threshold:
+            if not self.is_open:
+                logger.error(f"Circuit Breaker geöffnet nach {self.failures} Fehlern, Pause für {self.reset_timeout}s.")
+            self.opened_at = time.monotonic()
+
+
+class AdaptiveLimiter:
+    """Begrenzt parallele Anfragen; das Limit wächst bei Erfolg und halbiert sich bei Fehlern (AIMD)."""
+
+    def __init__(self, initial=4, minimum=1, maximum=16):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = float(max(minimum, min(initial, maximum)))
+        self.in_flight = 0
+        self._condition = asyncio.Condition()
+
+    async def __aenter__(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        async with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def record_success(self):
+        self.limit = min(self.maximum, self.limit + 1 / self.limit)
+
+    def record_failure(self):
+        self.limit = max(self.minimum, self.limit / 2)
+
+
+class HostState:
+    """Gemeinsamer Zustand aller Clients, die denselben Host ansprechen."""
+
+    def __init__(self, failure_threshold, reset_timeout, max_concurrency):
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.limiter = AdaptiveLimiter(initial=max(1, max_concurrency // 2), maximum=max_concurrency)
+
+
+_host_states = {}
+
+
+def _parse_retry_after(value):
+    """Wertet einen `Retry-After`-Header aus (Sekunden oder HTTP-Datum) und gibt Sekunden zurück."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+        return max(0.0, retry_at.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
 class APIClient:
-    def __init__(self, base_url, token):
+    def __init__(self, base_url, token, max_retries=3, backoff_base=0.5, backoff_max=30.0,
+                 failure_threshold=5, reset_timeout=30.0, max_concurrency=8):
         self.base_url = base_url.rstrip("/")
         self.headers = {"Authorization": f"Bearer {token}"}
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._session = None
 
-    async def get(self, endpoint):
-        """Sendet eine GET-Anfrage asynchron."""
+        host = urlparse(self.base_url).netloc or self.base_url
+        if host not in _host_states:
+            _host_states[host] = HostState(failure_threshold, reset_timeout, max_concurrency)
+        self.host_state = _host_states[host]
+
+    @property
+    def available(self):
+        """False, solange der Circuit Breaker des Hosts geöffnet ist."""
+        return self.host_state.breaker.allow_request()
+
+    def _backoff(self, attempt, retry_after=None):
+        """Exponentielles Backoff mit Full Jitter; `Retry-After` hat Vorrang."""
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    async def _get_session(self):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(headers=self.headers)
+        return self._session
+
+    async def _request(self, method, endpoint, **kwargs):
+        """Führt eine Anfrage mit Retry, Backoff, Circuit Breaker und adaptivem Limit aus."""
         url = f"{self.base_url}/{endpoint.lstrip('/')}"
-        try:
-            async with aiohttp.ClientSession(headers=self.headers) as session:
-                async with session.get(url) as response:
-                    if response.status == 200:
-                        return await response.text()
-                    else:
-                        logger.error(f"GET-Anfrage fehlgeschlagen: {url}, Status: {response.status}, Response: {await response.text()}")
+        breaker = self.host_state.breaker
+        limiter = self.host_state.limiter
+
+        for attempt in range(self.max_retries + 1):
+            if not breaker.allow_request():
+                logger.error(f"{method}-Anfrage übersprungen, Circuit Breaker offen: {url}")
+                return None
+
+            retry_after = None
+            try:
+                async with limiter:
+                    # Erneut prüfen: Während des Wartens auf einen Platz kann der Breaker geöffnet worden sein
+                    if not breaker.allow_request():
+                        logger.error(f"{method}-Anfrage übersprungen, Circuit Breaker offen: {url}")
                         return None
-        except Exception as e:
-            logger.error(f"Fehler bei GET-Anfrage: {url}, Fehler: {str(e)}")
-            return None
+                    session = await self._get_session()
+                    async with session.request(method, url, **kwargs) as response:
+                        if response.status == 200:
+                            breaker.record_success()
+                            limiter.record_success()
+                            if method == "GET":
+                                return await response.text()
+                            return await response.json(content_type=None)
+
+                        body = await response.text()
+                        if response.status not in RETRY_STATUS:
+                            logger.error(f"{method}-Anfrage fehlgeschlagen: {url}, Status: {response.status}, Response: {body}")
+                            return None
+
+                        retry_after = _parse_retry_after(response.headers.get("Retry-After"))
+                        logger.error(f"{method}-Anfrage fehlgeschlagen (Versuch {attempt + 1}): {url}, Status: {response.status}, Response: {body}")
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.error(f"Fehler bei {method}-Anfrage (Versuch {attempt + 1}): {url}, Fehler: {str(e)}")
+            except Exception as e:
+                logger.error(f"Fehler bei {method}-Anfrage: {url}, Fehler: {str(e)}")
+                return None
+
+            breaker.record_failure()
+            limiter.record_failure()
+            if attempt < self.max_retries:
+                await asyncio.sleep(self._backoff(attempt, retry_after))
+
+        return None
+
+    async def get(self, endpoint):
+        """Sendet eine GET-Anfrage asynchron."""
+        return await self._request("GET", endpoint)
 
     async def post(self, endpoint, data):
         """Sendet eine POST-Anfrage asynchron."""
+        return await self._request("POST", endpoint, json=data)
+
+    async def close(self):
+        """Schließt die gemeinsam genutzte HTTP-Session."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    def _sync_request(self, method, endpoint, **kwargs):
+        """Synchrone Variante von `_request` (ohne Parallelitätslimit)."""
         url = f"{self.base_url}/{endpoint.lstrip('/')}"
-        try:
-            async with aiohttp.ClientSession(headers=self.headers) as session:
-                async with session.post(url, json=data) as response:
-                    if response.status == 200:
-                        return await response.json()
-                    else:
-                        logger.error(f"POST-Anfrage fehlgeschlagen: {url}, Status: {response.status}, Response: {await response.text()}")
-                        return None
-        except Exception as e:
-            logger.error(f"Fehler bei POST-Anfrage: {url}, Fehler: {str(e)}")
-            return None
+        breaker = self.host_state.breaker
+
+        for attempt in range(self.max_retries + 1):
+            if not breaker.allow_request():
+                logger.error(f"Sync {method}-Anfrage übersprungen, Circuit Breaker offen: {url}")
+                return None
+
+            retry_after = None
+            try:
+                response = requests.request(method, url, headers=self.headers, **kwargs)
+                if response.status_code == 200:
+                    breaker.record_success()
+                    return response.text if method == "GET" else response.json()
+                if response.status_code not in RETRY_STATUS:
+                    logger.error(f"Sync {method}-Anfrage fehlgeschlagen: {url}, Status: {response.status_code}, Response: {response.text}")
+                    return None
+                retry_after = _parse_retry_after(response.headers.get("Retry-After"))
+                logger.error(f"Sync {method}-Anfrage fehlgeschlagen (Versuch {attempt + 1}): {url}, Status: {response.status_code}, Response: {response.text}")
+            except requests.RequestException as e:
+                logger.error(f"Fehler bei Sync {method}-Anfrage (Versuch {attempt + 1}): {url}, Fehler: {str(e)}")
+            except Exception as e:
+                logger.error(f"Fehler bei Sync {method}-Anfrage: {url}, Fehler: {str(e)}")
+                return None
+
+            breaker.record_failure()
+            if attempt < self.max_retries:
+                time.sleep(self._backoff(attempt, retry_after))
+
+        return None
 
     def sync_get(self, endpoint):
         """Sendet eine GET-Anfrage synchron."""
-        url = f"{self.base_url}/{endpoint.lstrip('/')}"
-        try:
-            response = requests.get(url, headers=self.headers)
-            if response.status_code == 200:
-                return response.text
-            else:
-                logger.error(f"Sync GET-Anfrage fehlgeschlagen: {url}, Status: {response.status_code}, Response: {response.text}")
-                return None
-        except Exception as e:
-            logger.error(f"Fehler bei Sync GET-Anfrage: {url}, Fehler: {str(e)}")
-            return None
+        return self._sync_request("GET", endpoint)
 
     def sync_post(self, endpoint, data):
         """Sendet eine POST-Anfrage synchron."""
-        url = f"{self.base_url}/{endpoint.lstrip('/')}"
-        try:
-            response = requests.post(url, json=data, headers=self.headers)
-            if response.status_code == 200:
-                return response.json()
-            else:
-                logger.error(f"Sync POST-Anfrage fehlgeschlagen: {url}, Status: {response.status_code}, Response: {response.text}")
-                return None
-        except Exception as e:
-            logger.error(f"Fehler bei Sync POST-Anfrage: {url}, Fehler: {str(e)}")
-            return None
+        return self._sync_request("POST", endpoint, json=data)
@@ -0,0 +1,100 @@
+"""Benchmark: Dict-Vergleich (bisher) gegen Merge-Join-Diff (`Database.iter_diff`).
+
+Aufruf: python bench_diff.py [Zeilenanzahl ...]   (Standard: 100000 1000000)
+
+Für jede Größe werden `vips` und `receiver_vips` mit je N Zeilen gefüllt, davon je ~1 %
+neu, entfernt und geändert. Gemessen werden Laufzeit und Spitzen-Speicher (tracemalloc,
+separater Lauf) für die Berechnung inklusive Speichern des Plans in `sync`.
+"""
+import os
+import sys
+import time
+import tempfile
+import tracemalloc
+from database import Database
+
+
+def dict_diff(db):
+    """Der bisherige Ansatz: beide Tabellen als Dicts laden und drei Listen aufbauen."""
+    main_vips = {row[0]: row for row in db.fetch_all("vips")}
+    target_vips = {row[0]: row for row in db.fetch_all("receiver_vips")}
+
+    to_add = []
+    to_remove = []
+    to_update = []
+
+    for player_id, description, expiration in main_vips.values():
+        if player_id not in target_vips:
+            to_add.append((player_id, description, expiration))
+        elif target_vips[player_id][1] != description or target_vips[player_id][2] != expiration:
+            to_update.append((player_id, description, expiration))
+
+    for player_id in target_vips:
+        if player_id not in main_vips:
+            to_remove.append(target_vips[player_id])
+
+    plan = (
+        [row + ("add",) for row in to_add]
+        + [row + ("remove",) for row in to_remove]
+        + [row + ("update",) for row in to_update]
+    )
+    return db.save_sync_plan(plan, None, None)
+
+
+def merge_diff(db):
+    return db.save_sync_plan(db.iter_diff("vips", "receiver_vips"), None, None)
+
+
+def populate(db, rows):
+    def source():
+        for i in range(rows):
+            if i % 100 == 1:
+                continue  # fehlt auf dem Hauptserver -> remove
+            expiration = "3001-01-01T00:00:00+00:00" if i % 100 == 2 else "3000-01-01T00:00:00+00:00"
+            yield (f"7656119{i:010d}", f"[KL]Spieler {i}", expiration)
+        for i in range(rows // 100):
+            yield (f"9656119{i:010d}", f"[KL]Neu {i}", "3000-01-01T00:00:00+00:00")  # neu -> add
+
+    def target():
+        for i in range(rows):
+            yield (f"7656119{i:010d}", f"[KL]Spieler {i}", "3000-01-01T00:00:00+00:00")
+
+    db.bulk_insert("vips", source())
+    db.bulk_insert("receiver_vips", target())
+    # Im Betrieb pflegen replace_table/ingest_snapshot die Bucket-Hashes beim Schreiben mit.
+    db.content_hash("vips")
+    db.content_hash("receiver_vips")
+
+
+def measure(db, diff):
+    start = time.perf_counter()
+    counts = diff(db)
+    elapsed = time.perf_counter() - start
+    plan = set(db.fetch_all("sync"))
+
+    tracemalloc.start()
+    diff(db)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, counts, plan
+
+
+def main(sizes):
+    for rows in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            db = Database(os.path.join(tmp, "bench.db"))
+            db.setup_tables()
+            populate(db, rows)
+
+            dict_time, dict_peak, dict_counts, dict_plan = measure(db, dict_diff)
+            merge_time, merge_peak, merge_counts, merge_plan = measure(db, merge_diff)
+            db.close()
+
+        assert dict_plan == merge_plan, "Pläne unterscheiden sich"
+        print(f"{rows:>9} Zeilen  Plan {merge_counts}")
+        print(f"  dict : {dict_time:7.2f} s  Spitze {dict_peak / 2**20:8.1f} MiB")
+        print(f"  merge: {merge_time:7.2f} s  Spitze {merge_peak / 2**20:8.1f} MiB")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [100000, 1000000])
@@ -1,57 +1,31 @@
 import os
-import re
-import requests
-import aiohttp
+import datetime
 import discord
-import unicodedata
-import logging
 import asyncio
-from api_client import APIClient
-from logging.handlers import RotatingFileHandler
 from discord.ext import commands
-from discord import Intents
-from dotenv import load_dotenv
-from database import Database
-
-# Umgebungsvariablen laden
-load_dotenv()
+from discord import Intents, app_commands
+from vip_sync import (
+    db, fetch_main_raw, setup_logging, log_to_file, ingest_main_snapshot, update_vip_tables,
+    apply_sync_plan, sync_task, apply_task, apply_changes_since, watch_main_changes,
+    verify_target as verify_target_list, start_paced_apply, apply_paced_tick, run_paced_apply, paced_apply_status,
+    flights, pipeline_lock, AUTO_SYNC_INTERVAL, CHANGE_POLL_INTERVAL, FETCH_FRESHNESS,
+    APPLY_RPS, APPLY_QUIET_HOURS, APPLY_ORDER,
+)
+from database import BUCKET_COUNT
+from vip_index import VipSearchIndex
+
+# Umgebungsvariablen (bereits durch `vip_sync` geladen)
 DISCORD_BOT_TOKEN = os.getenv("DISCORD_BOT_TOKEN")
-RCON_API_TOKEN = os.getenv("RCON_API_TOKEN")
-RCON_API_URL = os.getenv("RCON_API_URL")
-DB_FILE = os.getenv("DB_FILE", "vips.db")
 ALLOWED_ROLES = os.getenv("ALLOWED_ROLES", "").split(",")
 LOG_FILE = "send_vip.log"
-VIP_FILTERS = os.getenv("VIP_FILTERS", "").split(",")
-VIP_REGEX = re.compile(os.getenv("VIP_REGEX", r"(\S+)\s(.+)\s(\d{4}-\d{2}-\d{2}T.+)"))
-AUTO_SYNC_INTERVAL = int(os.getenv("AUTO_SYNC_INTERVAL", 24))  # In Stunden
 VIP_LOG_CHANNEL = int(os.getenv("VIP_LOG_CHANNEL", 0))
+SYNC_WORKER = os.getenv("SYNC_WORKER", "false").lower() in ("1", "true", "yes")  # Pipeline in separatem Prozess
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", 2))  # In Sekunden
+REPORT_FIELD_LINES = 15  # Maximale Zeilen pro Feld im Sync-Report
+DISCORD_GUILD_ID = int(os.getenv("DISCORD_GUILD_ID", 0))  # Slash-Befehle sofort nur für diesen Server registrieren
 
 # Logger einrichten
-logger = logging.getLogger("VIPBotLogger")
-logger.setLevel(logging.INFO)
-handler = RotatingFileHandler(LOG_FILE, maxBytes=5 * 1024 * 1024, backupCount=2, encoding="utf-8")
-formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-handler.setFormatter(formatter)
-logger.addHandler(handler)
-
-def log_to_file(log_message, level="INFO"):
-    """Schreibt Nachrichten mit verschiedenen Log-Levels in die Protokolldatei."""
-    if level == "INFO":
-        logger.info(log_message)
-    elif level == "DEBUG":
-        logger.debug(log_message)
-    elif level == "ERROR":
-        logger.error(log_message)
-    else:
-        logger.warning(f"Unbekanntes Log-Level: {level}. Nachricht: {log_message}")
-
-# Datenbank-Setup
-db = Database(DB_FILE)
-db.setup_tables()
-
-# API-Client für Hauptserver und Zielserver erstellen
-main_api = APIClient(base_url=RCON_API_URL, token=RCON_API_TOKEN)
-target_api = APIClient(base_url=os.getenv("TARGET_API_URL"), token=os.getenv("TARGET_API_TOKEN"))
+setup_logging(LOG_FILE)
 
 # Intents für den Bot definieren
 intents = Intents.default()
@@ -59,28 +33,72 @@ intents.message_content = True
 
 class VIPBot(commands.Bot):
     async def setup_hook(self):
-        self.loop.create_task(auto_sync_vips())
+        await sync_app_commands(self.tree)
+        search_index.refresh()
+        if SYNC_WORKER:
+            self.loop.create_task(relay_worker_jobs())
+        else:
+            self.loop.create_task(auto_sync_vips())
+            if CHANGE_POLL_INTERVAL:
+                self.loop.create_task(watch_vip_changes())
+            if APPLY_RPS:
+                self.loop.create_task(paced_apply_vips())
 
 # Bot initialisieren
 bot = VIPBot(command_prefix="!", intents=intents, reconnect=True)
 
+# Präfix-Index über `vips` und `vip_backup` für Autocomplete
+search_index = VipSearchIndex(db)
+
+
+def _has_allowed_role(member):
+    if not ALLOWED_ROLES:
+        return True
+    user_roles = [str(role.id) for role in getattr(member, "roles", [])]
+    return any(role_id in ALLOWED_ROLES for role_id in user_roles)
 
 def check_allowed_roles():
     """Decorator, um zu überprüfen, ob der Benutzer die erforderliche Rolle hat."""
     async def predicate(ctx):
-        if not ALLOWED_ROLES:
-            return True
-        user_roles = [str(role.id) for role in ctx.author.roles]
-        return any(role_id in ALLOWED_ROLES for role_id in user_roles)
+        return _has_allowed_role(ctx.author)
     return commands.check(predicate)
-    
-@bot.command()
-@check_allowed_roles()
-async def restore_vip(ctx, player_id: str):
-    """Stellt einen gelöschten VIP aus der Backup-Tabelle wieder her."""
+
+def check_allowed_roles_slash():
+    """Wie `check_allowed_roles`, aber für Slash-Befehle."""
+    async def predicate(interaction):
+        return _has_allowed_role(interaction.user)
+    return app_commands.check(predicate)
+
+async def sync_app_commands(tree):
+    """Registriert die Slash-Befehle bei Discord (mit DISCORD_GUILD_ID sofort, sonst global)."""
+    try:
+        if DISCORD_GUILD_ID:
+            guild = discord.Object(id=DISCORD_GUILD_ID)
+            tree.copy_global_to(guild=guild)
+            synced = await tree.sync(guild=guild)
+        else:
+            synced = await tree.sync()
+        log_to_file(f"✅ {len(synced)} Slash-Befehle registriert.", level="INFO")
+    except Exception as e:
+        log_to_file(f"Fehler beim Registrieren der Slash-Befehle: {str(e)}", level="ERROR")
+
+def _interaction_reply(interaction):
+    """Antwortet auf einen zurückgestellten Slash-Befehl, indem die ursprüngliche Antwort bearbeitet wird.
+
+    Hat dieselbe Signatur wie `ctx.send`, sodass die Befehle ihre Logik teilen können; jede Meldung
+    (auch Fortschritt) ersetzt den bisherigen Inhalt.
+    """
+    async def reply(content=None, embed=None, file=None):
+        await interaction.edit_original_response(
+            content=content, embed=embed, attachments=[file] if file else discord.utils.MISSING
+        )
+    return reply
+
+async def _restore_vip(reply, player_id):
     try:
         restored_vip = db.restore_vip(player_id)
         if restored_vip:
+            flights.invalidate()
             player_id, description, expiration = restored_vip
             log_to_file(f"🔄 VIP wiederhergestellt: {player_id} - {description} - {expiration}", level="INFO")
             embed = discord.Embed(
@@ -97,7 +115,7 @@ async def restore_vip(ctx, player_id: str):
                 color=discord.Color.red()
             )
         embed.set_footer(text="VIP-Bot | Erstellt von Fw.Schultz")
-        await ctx.send(embed=embed)
+        await reply(embed=embed)
     except Exception as e:
         log_to_file(f"Fehler beim Wiederherstellen des VIPs {player_id}: {str(e)}", level="ERROR")
         embed = discord.Embed(
@@ -106,252 +124,183 @@ async def restore_vip(ctx, player_id: str):
             color=discord.Color.red()
         )
         embed.set_footer(text="VIP-Bot | Erstellt von Fw.Schultz")
-        await ctx.send(embed=embed)
+        await reply(embed=embed)
+
+@bot.command()
+@check_allowed_roles()
+async def restore_vip(ctx, player_id: str):
+    """Stellt einen gelöschten VIP aus der Backup-Tabelle wieder her."""
+    await _restore_vip(ctx.send, player_id)
 
 @bot.command()
 @check_allowed_roles()
 async def update_vips(ctx):
     """VIP-Liste aktualisieren und Daten synchronisieren."""
-    try:
-        headers = {"Authorization": f"Bearer {RCON_API_TOKEN}"}
-        response = requests.get(f"{RCON_API_URL}/api/download_vips", headers=headers)
-
-        if response.status_code == 200:
-            raw_data = unicodedata.normalize("NFKC", response.content.decode("utf-8", errors="replace").strip())
-            lines = raw_data.split("\n")
+    if SYNC_WORKER:
+        await _enqueue_job(ctx.send, ctx.channel.id, "update")
+        return
 
-            # Filter und Regex anwenden
-            filtered_lines = [line for line in lines if any(filter_term in line for filter_term in VIP_FILTERS)]
-            parsed_vips = [
-                re.match(VIP_REGEX, line).groups() for line in filtered_lines if re.match(VIP_REGEX, line)
-            ]
+    try:
+        raw_text = await fetch_main_raw()
 
-            # Tabelle aktualisieren
-            db.delete_all("vips")
-            db.bulk_insert("vips", parsed_vips)
+        if raw_text is not None:
+            # Tabelle aktualisieren (Snapshot + Change-Feed)
+            ingest_main_snapshot(raw_text)
 
             await ctx.send("VIP-Datenbank erfolgreich aktualisiert.")
         else:
-            log_to_file(f"Fehler beim Abrufen der VIPs: {response.status_code}")
+            log_to_file("Fehler beim Abrufen der VIPs.")
             await ctx.send("Fehler beim Abrufen der VIPs.")
     except Exception as e:
         log_to_file(f"Fehler: {str(e)}")
         await ctx.send(f"Ein Fehler ist aufgetreten: {str(e)}")
 
-async def _update_vips(ctx):
-    """Aktualisiert die VIP-Datenbank für Hauptserver und Zielserver."""
-    try:
-        headers = {"Authorization": f"Bearer {RCON_API_TOKEN}"}
-        target_headers = {"Authorization": f"Bearer {os.getenv('TARGET_API_TOKEN')}"}
-
-        # **VIPs vom Hauptserver abrufen**
-        response = requests.get(f"{RCON_API_URL}/api/download_vips", headers=headers)
-        if response.status_code == 200:
-            raw_data = unicodedata.normalize("NFKC", response.content.decode("utf-8", errors="replace").strip())
-            lines = raw_data.split("\n")
-
-            filtered_lines = [line for line in lines if any(filter_term in line for filter_term in VIP_FILTERS)]
-            parsed_vips = [
-                re.match(VIP_REGEX, line).groups() for line in filtered_lines if re.match(VIP_REGEX, line)
-            ]
-
-            # **Hauptserver-Tabelle aktualisieren**
-            db.delete_all("vips")
-            db.bulk_insert("vips", parsed_vips)
-            log_to_file("VIP-Datenbank vom Hauptserver wurde aktualisiert.", level="INFO")
-        else:
-            log_to_file(f"Fehler beim Abrufen der VIPs vom Hauptserver: {response.status_code}", level="ERROR")
-            await ctx.send("❌ Fehler beim Abrufen der VIPs vom Hauptserver.")
-            return False
+def _plan_field(action, line_format):
+    """Formatiert bis zu REPORT_FIELD_LINES Plan-Einträge einer Aktion für ein Embed-Feld."""
+    lines = []
+    total = 0
+    for player_id, description, expiration, _ in db.iter_sync_plan(action):
+        total += 1
+        if total <= REPORT_FIELD_LINES:
+            lines.append(line_format.format(player_id=player_id, description=description, expiration=expiration))
+    if total > REPORT_FIELD_LINES:
+        lines.append(f"… und {total - REPORT_FIELD_LINES} weitere")
+    return "\n".join(lines)
+
+async def _send_sync_report():
+    """Meldet den gespeicherten Sync-Plan im VIP_LOG_CHANNEL."""
+    if not VIP_LOG_CHANNEL:
+        return
+    channel = bot.get_channel(VIP_LOG_CHANNEL)
+    if not channel:
+        log_to_file(f"❌ Fehler: VIP_LOG_CHANNEL ({VIP_LOG_CHANNEL}) konnte nicht gefunden werden.", level="ERROR")
+        return
 
-        # **VIPs vom Zielserver abrufen (für receiver_vips)**
-        target_response = requests.get(f"{os.getenv('TARGET_API_URL')}/api/download_vips", headers=target_headers)
-        if target_response.status_code == 200:
-            target_raw_data = unicodedata.normalize("NFKC", target_response.content.decode("utf-8", errors="replace").strip())
-            target_lines = target_raw_data.split("\n")
-
-            target_filtered_lines = [line for line in target_lines if any(filter_term in line for filter_term in VIP_FILTERS)]
-            target_parsed_vips = [
-                re.match(VIP_REGEX, line).groups() for line in target_filtered_lines if re.match(VIP_REGEX, line)
-            ]
-
-            # **Zielserver-Tabelle aktualisieren**
-            db.delete_all("receiver_vips")
-            db.bulk_insert("receiver_vips", target_parsed_vips)
-            log_to_file("VIP-Datenbank vom Zielserver (receiver_vips) wurde aktualisiert.", level="INFO")
-        else:
-            log_to_file(f"Fehler beim Abrufen der VIPs vom Zielserver: {target_response.status_code}", level="ERROR")
-            await ctx.send("❌ Fehler beim Abrufen der VIPs vom Zielserver.")
-            return False
+    embed = discord.Embed(
+        title="🔄 VIP-Synchronisation – Änderungen erkannt",
+        description="Diese Änderungen wurden ermittelt. Nutze `!apply_sync`, um sie zu übernehmen.",
+        color=discord.Color.orange()
+    )
+    fields = (
+        ("add", "✅ Hinzugefügt", "🟢 `{player_id}` - {description} - {expiration}"),
+        ("remove", "❌ Entfernt", "🔴 `{player_id}` - {description}"),
+        ("update", "🔄 Aktualisiert", "📝 `{player_id}` - {description} → `{expiration}`"),
+    )
+    for action, name, line_format in fields:
+        value = _plan_field(action, line_format)
+        if value:
+            embed.add_field(name=name, value=value, inline=False)
+    embed.set_footer(text="VIP-Bot | Erstellt von Fw.Schultz")
+    await channel.send(embed=embed)
+
+async def _enqueue_job(reply, channel_id, kind):
+    """Reiht einen Job für den Sync-Worker ein und bestätigt dies im aufrufenden Kanal."""
+    job_id = db.enqueue_job(kind, channel_id)
+    await reply(f"⏳ Job #{job_id} (`{kind}`) an den Sync-Worker übergeben. Fortschritt folgt in diesem Kanal.")
+    return job_id
+
+async def _wait_for_job(job_id):
+    """Wartet, bis der Sync-Worker einen Job abgeschlossen hat, und gibt True bei Erfolg zurück."""
+    while True:
+        status = db.get_job_status(job_id)
+        if status in ("done", "failed"):
+            return status == "done"
+        await asyncio.sleep(JOB_POLL_INTERVAL)
+
+async def relay_worker_jobs():
+    """Leitet Fortschrittsmeldungen des Sync-Workers an die aufrufenden Kanäle weiter.
+
+    Meldungen von Jobs ohne Kanal (automatische Synchronisation) gehen in den VIP_LOG_CHANNEL.
+    Nach jedem abgeschlossenen Sync-Job wird zusätzlich der Sync-Report gesendet.
+    """
+    await bot.wait_until_ready()
+    last_event_id = db.last_job_event_id()
+    db.mark_finished_jobs_reported()
+    while not bot.is_closed():
+        try:
+            for event_id, job_id, kind, channel_id, message in db.fetch_job_events(last_event_id):
+                last_event_id = event_id
+                channel = bot.get_channel(channel_id or VIP_LOG_CHANNEL)
+                if channel:
+                    await channel.send(f"`#{job_id} {kind}` {message}")
+
+            for job_id, kind, status, channel_id in db.fetch_unreported_jobs():
+                if kind in ("sync", "auto") and status == "done":
+                    await _send_sync_report()
+                db.mark_job_reported(job_id)
+        except Exception as e:
+            log_to_file(f"Fehler beim Weiterleiten der Worker-Meldungen: {str(e)}", level="ERROR")
+
+        await asyncio.sleep(JOB_POLL_INTERVAL)
 
-        return True
-    except Exception as e:
-        log_to_file(f"Fehler beim Aktualisieren der VIP-Daten: {str(e)}", level="ERROR")
-        await ctx.send(f"❌ Fehler beim Aktualisieren der VIP-Daten: {str(e)}")
-        return False
-        
 async def auto_sync_vips():
     """Automatische Synchronisation basierend auf dem Intervall in der .env-Datei."""
     await bot.wait_until_ready()  # Warten, bis der Bot bereit ist
     while not bot.is_closed():
         log_to_file(f"⏳ Automatische VIP-Synchronisation gestartet (Intervall: {AUTO_SYNC_INTERVAL} Stunden)...", level="INFO")
 
-        sync_result = await sync_vips_task()
-        if sync_result:
-            await apply_sync_task()
+        async with pipeline_lock:
+            sync_result = await sync_vips_task()
+            if sync_result:
+                await apply_sync_task()
 
         # Umrechnung von Stunden in Sekunden (1 Stunde = 3600 Sekunden)
         await asyncio.sleep(AUTO_SYNC_INTERVAL * 3600)
 
-async def sync_vips_task():
-    """Vergleicht die VIP-Listen und speichert Änderungen in der `sync`-Tabelle."""
-    try:
-        success = await _update_vips(None)  # Datenbank aktualisieren
-        if not success:
-            return False
+async def watch_vip_changes():
+    """Überträgt Änderungen am Hauptserver zeitnah und meldet sie im VIP_LOG_CHANNEL."""
+    await bot.wait_until_ready()
 
-        main_vips = {row[0]: row for row in db.fetch_all("vips")}
-        target_vips = {row[0]: row for row in db.fetch_all("receiver_vips")}
-
-        to_add = []
-        to_remove = []
-        to_update = []
-
-        for player_id, description, expiration in main_vips.values():
-            if player_id not in target_vips:
-                to_add.append((player_id, description, expiration))
-            elif target_vips[player_id][1] != description or target_vips[player_id][2] != expiration:
-                to_update.append((player_id, description, expiration))  # Änderung in `description` oder `expiration`
-
-        for player_id in target_vips:
-            if player_id not in main_vips:
-                to_remove.append(target_vips[player_id])
-
-        # 🛠 Bevor neue Änderungen eingefügt werden, alte `player_id`-Einträge in `sync` löschen
-        for player_id, _, _ in to_add + to_remove + to_update:
-            db.execute_query("DELETE FROM sync WHERE player_id = ?", (player_id,))
-
-        # `sync`-Tabelle aktualisieren
-        if to_add:
-            db.bulk_insert("sync", to_add)
-        if to_remove:
-            for player_id, description, expiration in to_remove:
-                db.execute_query("INSERT INTO sync (player_id, description, expiration) VALUES (?, ?, ?)", (player_id, description, expiration))
-        if to_update:
-            for player_id, description, expiration in to_update:
-                db.execute_query("INSERT INTO sync (player_id, description, expiration) VALUES (?, ?, ?)", (player_id, description, expiration))
-
-        log_to_file(f"{len(to_add)} VIPs zur `sync`-Tabelle hinzugefügt.", level="INFO")
-        log_to_file(f"{len(to_remove)} VIPs zur Entfernung in `sync` gespeichert.", level="INFO")
-        log_to_file(f"{len(to_update)} VIPs mit aktualisiertem Ablaufdatum oder Namen gespeichert.", level="INFO")
+    async def progress(message):
+        channel = bot.get_channel(VIP_LOG_CHANNEL) if VIP_LOG_CHANNEL else None
+        if channel:
+            await channel.send(message)
 
-        # **📢 Log-Channel Update**
-        if VIP_LOG_CHANNEL:
-            channel = bot.get_channel(VIP_LOG_CHANNEL)
-            if channel:
-                embed = discord.Embed(
-                    title="🔄 VIP-Synchronisation – Änderungen erkannt",
-                    description="Diese Änderungen wurden ermittelt. Nutze `!apply_sync`, um sie zu übernehmen.",
-                    color=discord.Color.orange()
-                )
-                if to_add:
-                    embed.add_field(name="✅ Hinzugefügt", value="\n".join([f"🟢 `{player_id}` - {description}" for player_id, description, expiration in to_add]) or "Keine neuen VIPs.", inline=False)
-                if to_remove:
-                    embed.add_field(name="❌ Entfernt", value="\n".join([f"🔴 `{player_id}` - {description}" for player_id, description, expiration in to_remove]) or "Keine VIPs entfernt.", inline=False)
-                if to_update:
-                    embed.add_field(name="🔄 Aktualisiert", value="\n".join([f"📝 `{player_id}` - {description} → `{expiration}`" for player_id, description, expiration in to_update]) or "Keine Aktualisierungen.", inline=False)
-                embed.set_footer(text="VIP-Bot | Erstellt von Fw.Schultz")
-                await channel.send(embed=embed)
-            else:
-                log_to_file(f"❌ Fehler: VIP_LOG_CHANNEL ({VIP_LOG_CHANNEL}) konnte nicht gefunden werden.", level="ERROR")
+    async def trigger(snapshot_id):
+        return await apply_changes_since(snapshot_id, progress)
 
-        return True
+    log_to_file(f"👀 Change-Watcher gestartet (Intervall: {CHANGE_POLL_INTERVAL} Sekunden).", level="INFO")
+    await watch_main_changes(trigger)
 
-    except Exception as e:
-        log_to_file(f"Fehler bei der Synchronisation: {str(e)}", level="ERROR")
-        return False
+async def paced_apply_vips():
+    """Überträgt einen offenen Sync-Plan gedrosselt im Hintergrund und meldet jeden Durchlauf im VIP_LOG_CHANNEL."""
+    await bot.wait_until_ready()
 
-async def apply_sync_task():
-    """Wendet die geplanten VIP-Änderungen an, indem sie an den Zielserver gesendet werden."""
-    try:
-        target_headers = {"Authorization": f"Bearer {os.getenv('TARGET_API_TOKEN')}"}
-        add_vip_url = f"{os.getenv('TARGET_API_URL')}/api/add_vip"
-        remove_vip_url = f"{os.getenv('TARGET_API_URL')}/api/remove_vip"
+    async def progress(message):
+        channel = bot.get_channel(VIP_LOG_CHANNEL) if VIP_LOG_CHANNEL else None
+        if channel:
+            await channel.send(message)
 
-        sync_data = db.fetch_all("sync")
-        if not sync_data:
-            log_to_file("ℹ️ Keine Änderungen in `sync` gespeichert. `!sync_vips` zuerst ausführen.", level="INFO")
-            return
+    async def tick():
+        return await apply_paced_tick(progress)
 
-        log_to_file(f"📋 Geplante Änderungen aus `sync`: {sync_data}", level="INFO")
-
-        main_vips = {row[0]: row for row in db.fetch_all("vips")}
-        target_vips = {row[0]: row for row in db.fetch_all("receiver_vips")}
-
-        to_add = []
-        to_remove = []
-
-        for player_id, description, expiration in sync_data:
-            if player_id in main_vips:
-                main_desc, main_exp = main_vips[player_id][1], main_vips[player_id][2]
-                
-                if player_id in target_vips:
-                    target_desc, target_exp = target_vips[player_id][1], target_vips[player_id][2]
-                    
-                    # Falls sich die Beschreibung oder das Ablaufdatum geändert hat, entfernen und neu hinzufügen
-                    if main_desc != target_desc or main_exp != target_exp:
-                        to_remove.append(player_id)
-                        to_add.append((player_id, main_desc, main_exp))
-                else:
-                    to_add.append((player_id, main_desc, main_exp))
-            else:
-                to_remove.append(player_id)
-
-        log_to_file(f"🔄 VIPs zum Entfernen: {to_remove}", level="INFO")
-        log_to_file(f"✅ VIPs zum Hinzufügen: {to_add}", level="INFO")
-
-        added_count = 0
-        removed_count = 0
-
-        for player_id in to_remove:
-            async with aiohttp.ClientSession(headers=target_headers) as session:
-                async with session.post(remove_vip_url, json={"player_id": player_id}) as response:
-                    response_text = await response.text()
-                    if response.status == 200:
-                        removed_count += 1
-                        log_to_file(f"✅ Entfernt: {player_id}")
-                    else:
-                        log_to_file(f"❌ Fehler beim Entfernen von VIP {player_id}: {response.status} - {response_text}", level="ERROR")
-
-        for player_id, description, expiration in to_add:
-            async with aiohttp.ClientSession(headers=target_headers) as session:
-                async with session.post(add_vip_url, json={"player_id": player_id, "description": description, "expiration": expiration}) as response:
-                    response_text = await response.text()
-                    if response.status == 200:
-                        added_count += 1
-                        log_to_file(f"✅ Hinzugefügt: {player_id} - {description} - {expiration}")
-                    else:
-                        log_to_file(f"❌ Fehler beim Hinzufügen von VIP {player_id}: {response.status} - {response_text}", level="ERROR")
+    log_to_file(f"🐢 Gedrosselte Übertragung aktiv ({APPLY_RPS:g} Anfragen/s).", level="INFO")
+    await run_paced_apply(tick)
 
-        db.delete_all("sync")
+async def sync_vips_task(progress=None):
+    """Vergleicht die VIP-Listen und speichert Änderungen in der `sync`-Tabelle.
 
-        log_to_file(f"✅ Synchronisation abgeschlossen: {added_count} hinzugefügt, {removed_count} entfernt.", level="INFO")
+    Gleichzeitige Aufrufe (Befehle und Auto-Sync) teilen sich einen Lauf und damit auch einen Report.
+    """
+    async def sync_and_report(progress):
+        if not await sync_task(progress):
+            return False
 
-    except Exception as e:
-        log_to_file(f"❌ Fehler bei der Synchronisation: {str(e)}", level="ERROR")
-        embed = discord.Embed(
-            title="❌ Fehler bei der Synchronisation",
-            description=f"Ein Fehler ist aufgetreten: `{str(e)}`",
-            color=discord.Color.red()
-        )
-        embed.set_footer(text="VIP-Bot | Erstellt von Fw.Schultz")
-        await ctx.send(embed=embed)
+        # **📢 Log-Channel Update**
+        await _send_sync_report()
+        return True
 
-@bot.command()
-@check_allowed_roles()
-async def export_vips(ctx):
-    """Exportiert die aktuelle VIP-Liste in eine Datei."""
-    if not await _update_vips(ctx):
+    return await flights.run("sync_report", sync_and_report, progress, FETCH_FRESHNESS)
+
+async def apply_sync_task():
+    """Wendet die geplanten VIP-Änderungen an, indem sie an den Zielserver gesendet werden."""
+    return await apply_task()
+
+async def _export_vips(reply, channel_id):
+    if SYNC_WORKER:
+        if not await _wait_for_job(await _enqueue_job(reply, channel_id, "update")):
+            return
+    elif not await update_vip_tables(reply):
         return
 
     try:
@@ -365,7 +314,7 @@ async def export_vips(ctx):
                 color=discord.Color.blue()
             )
             embed.set_footer(text="VIP-Bot | Erstellt von Fw.Schultz")
-            await ctx.send(embed=embed)
+            await reply(embed=embed)
             return
 
         with open(output_file, "w", encoding="utf-8") as file:
@@ -379,7 +328,7 @@ async def export_vips(ctx):
         )
         embed.set_footer(text="VIP-Bot | Erstellt von Fw.Schultz")
 
-        await ctx.send(embed=embed, file=discord.File(output_file))
+        await reply(embed=embed, file=discord.File(output_file))
 
     except Exception as e:
         log_to_file(f"Fehler beim Exportieren der VIP-Liste: {str(e)}", level="ERROR")
@@ -391,80 +340,22 @@ async def export_vips(ctx):
         )
         embed.set_footer(text="VIP-Bot | Erstellt von Fw.Schultz")
 
-        await ctx.send(embed=embed)
+        await reply(embed=embed)
 
 @bot.command()
 @check_allowed_roles()
-async def sync_vips(ctx):
-    """Vergleicht die VIP-Listen und speichert Änderungen in der `sync`-Tabelle, bevor sie an den Zielserver gesendet werden."""
-    if not await _update_vips(ctx):
+async def export_vips(ctx):
+    """Exportiert die aktuelle VIP-Liste in eine Datei."""
+    await _export_vips(ctx.send, ctx.channel.id)
+
+async def _sync_vips(reply, channel_id):
+    if SYNC_WORKER:
+        await _enqueue_job(reply, channel_id, "sync")
         return
 
     try:
-        main_vips = {row[0]: row for row in db.fetch_all("vips")}
-        target_vips = {row[0]: row for row in db.fetch_all("receiver_vips")}
-
-        to_add = []
-        to_remove = []
-        to_update = []
-
-        for player_id, description, expiration in main_vips.values():
-            if player_id not in target_vips:
-                to_add.append((player_id, description, expiration))
-            elif target_vips[player_id][2] != expiration:
-                to_update.append((player_id, description, expiration))
-
-        for player_id in target_vips:
-            if player_id not in main_vips:
-                to_remove.append(target_vips[player_id])
-
-        # `sync`-Tabelle leeren und Änderungen speichern
-        db.delete_all("sync")
-
-        if to_add:
-            db.bulk_insert("sync", to_add)
-        if to_remove:
-            for player_id, description, expiration in to_remove:
-                db.execute_query("INSERT INTO sync (player_id, description, expiration) VALUES (?, ?, ?)", (player_id, description, expiration))
-        if to_update:
-            for player_id, description, expiration in to_update:
-                db.execute_query("INSERT INTO sync (player_id, description, expiration) VALUES (?, ?, ?)", (player_id, description, expiration))
-
-        log_to_file(f"{len(to_add)} VIPs zur `sync`-Tabelle hinzugefügt.", level="INFO")
-        log_to_file(f"{len(to_remove)} VIPs zur Entfernung in `sync` gespeichert.", level="INFO")
-        log_to_file(f"{len(to_update)} VIPs mit aktualisiertem Ablaufdatum gespeichert.", level="INFO")
-
-        # **📢 Log-Channel Update**
-        if VIP_LOG_CHANNEL:
-            channel = bot.get_channel(VIP_LOG_CHANNEL)
-            if channel:
-                embed = discord.Embed(
-                    title="🔄 VIP-Synchronisation – Änderungen erkannt",
-                    description="Diese Änderungen wurden ermittelt. Nutze `!apply_sync`, um sie zu übernehmen.",
-                    color=discord.Color.orange()
-                )
-                if to_add:
-                    embed.add_field(
-                        name="✅ Hinzugefügt",
-                        value="\n".join([f"🟢 `{player_id}` - {description} - {expiration}" for player_id, description, expiration in to_add]) or "Keine neuen VIPs.",
-                        inline=False
-                    )
-                if to_remove:
-                    embed.add_field(
-                        name="❌ Entfernt",
-                        value="\n".join([f"🔴 `{player_id}` - {description}" for player_id, description, expiration in to_remove]) or "Keine VIPs entfernt.",
-                        inline=False
-                    )
-                if to_update:
-                    embed.add_field(
-                        name="🔄 Ablaufdatum aktualisiert",
-                        value="\n".join([f"📝 `{player_id}` - {description} → `{expiration}`" for player_id, description, expiration in to_update]) or "Keine Ablaufdatum-Änderungen.",
-                        inline=False
-                    )
-                embed.set_footer(text="VIP-Bot | Erstellt von Fw.Schultz")
-                await channel.send(embed=embed)
-
-        await ctx.send("✅ Synchronisation abgeschlossen. Änderungen mit `!apply_sync` übernehmen.")
+        if await sync_vips_task(reply):
+            await reply("✅ Synchronisation abgeschlossen. Änderungen mit `!apply_sync` übernehmen.")
 
     except Exception as e:
         log_to_file(f"Fehler bei der Synchronisation: {str(e)}", level="ERROR")
@@ -474,66 +365,68 @@ async def sync_vips(ctx):
             color=discord.Color.red()
         )
         embed.set_footer(text="VIP-Bot | Erstellt von Fw.Schultz")
-        await ctx.send(embed=embed)
+        await reply(embed=embed)
 
 @bot.command()
 @check_allowed_roles()
-async def apply_sync(ctx):
-    """Wendet die geplanten VIP-Änderungen an, indem sie an den Zielserver gesendet werden."""
-    try:
-        target_headers = {"Authorization": f"Bearer {os.getenv('TARGET_API_TOKEN')}"}
-        add_vip_url = f"{os.getenv('TARGET_API_URL')}/api/add_vip"
-        remove_vip_url = f"{os.getenv('TARGET_API_URL')}/api/remove_vip"
+async def sync_vips(ctx):
+    """Vergleicht die VIP-Listen und speichert Änderungen in der `sync`-Tabelle, bevor sie an den Zielserver gesendet werden."""
+    await _sync_vips(ctx.send, ctx.channel.id)
 
-        sync_data = db.fetch_all("sync")
-        if not sync_data:
+async def _apply_sync(reply, channel_id):
+    if SYNC_WORKER:
+        await _enqueue_job(reply, channel_id, "apply")
+        return
+
+    try:
+        if not sum(db.sync_plan_counts().values()):
             embed = discord.Embed(
                 title="ℹ️ Keine Änderungen in `sync` gespeichert",
                 description="Nutze zuerst `!sync_vips`, um Änderungen zu berechnen.",
                 color=discord.Color.blue()
             )
             embed.set_footer(text="VIP-Bot | Erstellt von Fw.Schultz")
-            await ctx.send(embed=embed)
+            await reply(embed=embed)
+            return
+
+        if db.is_sync_plan_stale():
+            embed = discord.Embed(
+                title="⚠️ Sync-Plan veraltet",
+                description="Die VIP-Listen haben sich seit `!sync_vips` geändert. Bitte `!sync_vips` erneut ausführen.",
+                color=discord.Color.orange()
+            )
+            embed.set_footer(text="VIP-Bot | Erstellt von Fw.Schultz")
+            await reply(embed=embed)
             return
 
-        main_vips = {row[0]: row for row in db.fetch_all("vips")}
-        target_vips = {row[0]: row for row in db.fetch_all("receiver_vips")}
-
-        to_add = [row for row in sync_data if row[0] in main_vips and row[0] not in target_vips]
-        to_remove = [row for row in sync_data if row[0] in target_vips and row[0] not in main_vips]
-
-        added_count = 0
-        removed_count = 0
-
-        for player_id, description, expiration in to_add:
-            async with aiohttp.ClientSession(headers=target_headers) as session:
-                async with session.post(add_vip_url, json={"player_id": player_id, "description": description, "expiration": expiration}) as response:
-                    if response.status == 200:
-                        added_count += 1
-                        log_to_file(f"✅ VIP hinzugefügt: {player_id} - {description} - {expiration}")
-                    else:
-                        error_text = await response.text()
-                        log_to_file(f"❌ Fehler beim Hinzufügen von VIP {player_id}: {error_text}", level="ERROR")
-
-        for player_id, _, _ in to_remove:
-            async with aiohttp.ClientSession(headers=target_headers) as session:
-                async with session.post(remove_vip_url, json={"player_id": player_id}) as response:
-                    if response.status == 200:
-                        removed_count += 1
-                        log_to_file(f"✅ VIP entfernt: {player_id}")
-                    else:
-                        error_text = await response.text()
-                        log_to_file(f"❌ Fehler beim Entfernen von VIP {player_id}: {error_text}", level="ERROR")
+        if APPLY_RPS:
+            await start_paced_apply(reply)
+            await reply(embed=_apply_status_embed())
+            return
 
-        db.delete_all("sync")
+        # Wie im Sync-Worker: keine gleichzeitigen Tabellen-Updates durch Auto-Sync oder Change-Watcher
+        async with pipeline_lock:
+            added_count, removed_count, failed_count, completed = await apply_sync_plan(reply)
+
+        if not completed:
+            embed = discord.Embed(
+                title="⛔ Zielserver nicht erreichbar",
+                description=f"Die Synchronisation wurde abgebrochen: `{added_count}` hinzugefügt, `{removed_count}` entfernt. `!apply_sync` später erneut ausführen.",
+                color=discord.Color.red()
+            )
+            embed.set_footer(text="VIP-Bot | Erstellt von Fw.Schultz")
+            await reply(embed=embed)
+            return
 
         embed = discord.Embed(
             title="✅ VIP-Änderungen übernommen",
-            description=f"Es wurden `{added_count}` VIPs hinzugefügt und `{removed_count}` VIPs entfernt.",
+            description=f"Es wurden `{added_count}` VIPs hinzugefügt und `{removed_count}` VIPs entfernt (Aktualisierungen zählen in beiden).",
             color=discord.Color.green()
         )
+        if failed_count:
+            embed.add_field(name="❌ Fehlgeschlagen", value=f"`{failed_count}` Anfragen, siehe Log.", inline=False)
         embed.set_footer(text="VIP-Bot | Erstellt von Fw.Schultz")
-        await ctx.send(embed=embed)
+        await reply(embed=embed)
 
     except Exception as e:
         log_to_file(f"Fehler beim Anwenden der Synchronisation: {str(e)}", level="ERROR")
@@ -543,6 +436,86 @@ async def apply_sync(ctx):
             color=discord.Color.red()
         )
         embed.set_footer(text="VIP-Bot | Erstellt von Fw.Schultz")
+        await reply(embed=embed)
+
+@bot.command()
+@check_allowed_roles()
+async def apply_sync(ctx):
+    """Wendet die geplanten VIP-Änderungen an, indem sie an den Zielserver gesendet werden."""
+    await _apply_sync(ctx.send, ctx.channel.id)
+
+def _apply_status_embed():
+    """Embed mit dem offenen Rest des Sync-Plans und dem Stand der gedrosselten Übertragung."""
+    # Im Worker-Modus sendet nur der Worker an den Zielserver, der Breaker des Bots sagt nichts aus
+    status = paced_apply_status(local_breaker=not SYNC_WORKER)
+    counts = status["counts"]
+    if not status["requests"]:
+        description = "Kein offener Sync-Plan."
+    elif APPLY_RPS:
+        description = f"`{status['requests']}` Anfragen offen, Übertragung mit `{APPLY_RPS:g}` Anfragen/s."
+    else:
+        description = f"`{status['requests']}` Anfragen offen. Gedrosselte Übertragung ist aus (`APPLY_RPS=0`), `!apply_sync` überträgt alles auf einmal."
+    embed = discord.Embed(title="📊 Übertragungsstatus", description=description, color=discord.Color.blue())
+    embed.add_field(name="🟢 Hinzufügen", value=f"`{counts['add']}`", inline=True)
+    embed.add_field(name="🔴 Entfernen", value=f"`{counts['remove']}`", inline=True)
+    embed.add_field(name="📝 Aktualisieren", value=f"`{counts['update']}`", inline=True)
+    if status["requests"] and status["eta_seconds"] is not None:
+        embed.add_field(name="⏱ Geschätzte Dauer", value=f"`{datetime.timedelta(seconds=int(status['eta_seconds']))}` (ohne Ruhezeit)", inline=True)
+        embed.add_field(name="↕️ Reihenfolge", value=f"`{APPLY_ORDER}`", inline=True)
+    if APPLY_QUIET_HOURS:
+        embed.add_field(name="🌙 Ruhezeit", value=f"`{APPLY_QUIET_HOURS}` – {'jetzt aktiv' if status['quiet'] else 'nicht aktiv'}", inline=True)
+    if status["stale"]:
+        embed.add_field(name="⚠️ Plan veraltet", value="Die VIP-Listen haben sich geändert. Bitte `!sync_vips` erneut ausführen.", inline=False)
+    if status["available"] is False:
+        embed.add_field(name="⛔ Zielserver", value="Nicht erreichbar (Circuit Breaker offen), die Übertragung pausiert.", inline=False)
+    embed.set_footer(text="VIP-Bot | Erstellt von Fw.Schultz")
+    return embed
+
+@bot.command()
+@check_allowed_roles()
+async def apply_status(ctx):
+    """Zeigt den offenen Rest des Sync-Plans und den Stand der gedrosselten Übertragung."""
+    await ctx.send(embed=_apply_status_embed())
+
+@bot.command()
+@check_allowed_roles()
+async def verify_target(ctx):
+    """Lädt die VIP-Liste des Zielservers neu und prüft über Bucket-Hashes, ob sie mit `vips` übereinstimmt."""
+    if SYNC_WORKER:
+        await _enqueue_job(ctx.send, ctx.channel.id, "verify")
+        return
+
+    try:
+        buckets = await verify_target_list()
+        if buckets is None:
+            embed = discord.Embed(
+                title="❌ Zielserver nicht erreichbar",
+                description="Die VIP-Liste des Zielservers konnte nicht abgerufen werden.",
+                color=discord.Color.red()
+            )
+        elif buckets:
+            embed = discord.Embed(
+                title="⚠️ Zielserver nicht synchron",
+                description=f"`{len(buckets)}` von `{BUCKET_COUNT}` Buckets weichen ab. Nutze `!sync_vips`, um die Unterschiede zu planen.",
+                color=discord.Color.orange()
+            )
+        else:
+            embed = discord.Embed(
+                title="✅ Zielserver synchron",
+                description="Alle Bucket-Hashes von Haupt- und Zielserver stimmen überein.",
+                color=discord.Color.green()
+            )
+        embed.set_footer(text="VIP-Bot | Erstellt von Fw.Schultz")
+        await ctx.send(embed=embed)
+
+    except Exception as e:
+        log_to_file(f"Fehler bei der Überprüfung des Zielservers: {str(e)}", level="ERROR")
+        embed = discord.Embed(
+            title="❌ Fehler bei der Überprüfung",
+            description=f"Ein Fehler ist aufgetreten: `{str(e)}`",
+            color=discord.Color.red()
+        )
+        embed.set_footer(text="VIP-Bot | Erstellt von Fw.Schultz")
         await ctx.send(embed=embed)
 
 @bot.command()
@@ -567,10 +540,11 @@ async def show_sync(ctx):
             color=discord.Color.blue()
         )
 
-        for player_id, description, expiration in sync_data:
+        action_labels = {"add": "🟢 Hinzufügen", "remove": "🔴 Entfernen", "update": "📝 Aktualisieren"}
+        for player_id, description, expiration, action in sync_data:
             embed.add_field(
                 name=f"🆔 `{player_id}`",
-                value=f"📋 **Beschreibung**: `{description}`\n⏳ **Ablaufdatum**: `{expiration}`",
+                value=f"{action_labels.get(action, action)}\n📋 **Beschreibung**: `{description}`\n⏳ **Ablaufdatum**: `{expiration}`",
                 inline=False
             )
 
@@ -598,6 +572,7 @@ async def clear_vips(ctx):
         db.delete_all("vips")
         db.delete_all("receiver_vips")
         db.delete_all("sync")
+        flights.invalidate()
         log_to_file("Alle VIP-Daten wurden gelöscht und gesichert.", level="INFO")
         embed = discord.Embed(
             title="🗑 VIP-Datenbank geleert",
@@ -616,12 +591,9 @@ async def clear_vips(ctx):
         embed.set_footer(text="VIP-Bot | Erstellt von Fw.Schultz")
         await ctx.send(embed=embed)
 
-@bot.command()
-@check_allowed_roles()
-async def check_vip(ctx, name: str):
-    """Sucht nach einem VIP in der Datenbank basierend auf einem Teilstring des Namens."""
+async def _check_vip(reply, name):
     try:
-        query = "SELECT * FROM vips WHERE description LIKE ?"
+        query = "SELECT player_id, description, expiration FROM vips WHERE description LIKE ?"
         results = db.execute_query(query, (f"%{name}%",))
 
         if results:
@@ -644,7 +616,7 @@ async def check_vip(ctx, name: str):
             )
 
         embed.set_footer(text="VIP-Bot | Erstellt von Fw.Schultz")
-        await ctx.send(embed=embed)
+        await reply(embed=embed)
 
     except Exception as e:
         log_to_file(f"Fehler beim Überprüfen von VIPs mit Name `{name}`: {str(e)}", level="ERROR")
@@ -656,8 +628,14 @@ async def check_vip(ctx, name: str):
         )
         embed.set_footer(text="VIP-Bot | Erstellt von Fw.Schultz")
 
-        await ctx.send(embed=embed)
-        
+        await reply(embed=embed)
+
+@bot.command()
+@check_allowed_roles()
+async def check_vip(ctx, name: str):
+    """Sucht nach einem VIP in der Datenbank basierend auf einem Teilstring des Namens."""
+    await _check_vip(ctx.send, name)
+
 @bot.command()
 @check_allowed_roles()
 async def show_backup(ctx):
@@ -702,6 +680,48 @@ async def show_backup(ctx):
 
         await ctx.send(embed=embed)
 
+@bot.command()
+@check_allowed_roles()
+async def show_changes(ctx, player_id: str = None):
+    """Zeigt die letzten Änderungen an der VIP-Liste des Hauptservers (Change-Feed)."""
+    try:
+        changes = db.fetch_change_history(player_id)
+
+        if not changes:
+            embed = discord.Embed(
+                title="ℹ️ Keine Änderungen gefunden",
+                description="Im Change-Feed sind keine passenden Einträge gespeichert.",
+                color=discord.Color.blue()
+            )
+            embed.set_footer(text="VIP-Bot | Erstellt von Fw.Schultz")
+            await ctx.send(embed=embed)
+            return
+
+        embed = discord.Embed(
+            title="🕓 VIP-Änderungen auf dem Hauptserver",
+            description=f"Letzte Änderungen für `{player_id}`:" if player_id else "Letzte erkannte Änderungen:",
+            color=discord.Color.blue()
+        )
+        change_labels = {"added": "🟢 Hinzugefügt", "removed": "🔴 Entfernt", "changed": "📝 Geändert"}
+        for fetched_at, change_player_id, change, description, expiration in changes:
+            embed.add_field(
+                name=f"{change_labels.get(change, change)} – `{change_player_id}`",
+                value=f"📋 **Beschreibung**: `{description}`\n⏳ **Ablaufdatum**: `{expiration}`\n🕓 **Erkannt**: `{fetched_at}`",
+                inline=False
+            )
+        embed.set_footer(text="VIP-Bot | Erstellt von Fw.Schultz")
+        await ctx.send(embed=embed)
+
+    except Exception as e:
+        log_to_file(f"Fehler beim Abrufen des Change-Feeds: {str(e)}", level="ERROR")
+        embed = discord.Embed(
+            title="❌ Fehler beim Abrufen der Änderungen",
+            description=f"Ein Fehler ist aufgetreten: `{str(e)}`",
+            color=discord.Color.red()
+        )
+        embed.set_footer(text="VIP-Bot | Erstellt von Fw.Schultz")
+        await ctx.send(embed=embed)
+
 @bot.command()
 @check_allowed_roles()
 async def vipbot(ctx):
@@ -716,16 +736,20 @@ async def vipbot(ctx):
     embed.add_field(name="🔄 `!sync_vips`", value="Berechnet Änderungen und speichert sie in `sync`.", inline=False)
     embed.add_field(name="📋 `!show_sync`", value="Zeigt die geplanten VIP-Änderungen aus `sync` an.", inline=False)
     embed.add_field(name="✅ `!apply_sync`", value="Wendet die geplanten Änderungen aus `sync` an und sendet sie an den Zielserver.", inline=False)
+    embed.add_field(name="📊 `!apply_status`", value="Zeigt, wie viele Änderungen noch an den Zielserver übertragen werden müssen.", inline=False)
     
     # VIP-Datenbank
     embed.add_field(name="📥 `!export_vips`", value="Exportiert die aktuelle VIP-Liste und sendet sie als Datei.", inline=False)
     embed.add_field(name="🗑 `!clear_vips`", value="Speichert VIPs im Backup und löscht sie aus `vips`, `receiver_vips` und `sync`.", inline=False)
+    embed.add_field(name="🕓 `!show_changes [player_id]`", value="Zeigt die letzten erkannten Änderungen an der VIP-Liste des Hauptservers.", inline=False)
     embed.add_field(name="🔍 `!check_vip <name>`", value="Überprüft, ob ein VIP mit einem bestimmten Namen in der Datenbank existiert (auch Teilstrings).", inline=False)
     
     # Backup & Wiederherstellung
     embed.add_field(name="🛡 `!show_backup`", value="Zeigt alle VIPs im Backup an.", inline=False)
     embed.add_field(name="♻️ `!restore_vip <player_id>`", value="Stellt einen gelöschten VIP aus dem Backup wieder her.", inline=False)
 
+    embed.add_field(name="🔍 `!verify_target`", value="Prüft über Bucket-Hashes, ob die VIP-Liste des Zielservers mit dem Hauptserver übereinstimmt.", inline=False)
+    embed.add_field(name="⚡ Slash-Befehle", value="`/check_vip`, `/restore_vip`, `/sync_vips`, `/apply_sync`, `/export_vips` und `/apply_status` mit Autocomplete und Fortschrittsanzeige.", inline=False)
     embed.add_field(name="ℹ️ `!vipbot`", value="Zeigt diese Befehlsübersicht an.", inline=False)
     embed.add_field(
         name="ℹ️ `!?????`", 
@@ -737,6 +761,79 @@ async def vipbot(ctx):
 
     await ctx.send(embed=embed)
 
+# Slash-Befehle: antworten sofort mit "denkt nach…" und bearbeiten die Antwort mit Fortschritt und Ergebnis
+
+async def _autocomplete_choices(interaction, table, current, value_column):
+    """Autocomplete-Vorschläge aus dem Präfix-Index; `value_column` 0 = Player-ID, 1 = Beschreibung."""
+    if not _has_allowed_role(interaction.user):
+        return []
+    try:
+        matches = await search_index.search(table, current)
+    except Exception as e:
+        log_to_file(f"Fehler beim Autocomplete für `{current}`: {str(e)}", level="ERROR")
+        return []
+    return [
+        app_commands.Choice(name=f"{description} ({player_id})"[:100], value=(player_id, description)[value_column][:100])
+        for player_id, description in matches
+    ]
+
+async def vip_name_autocomplete(interaction, current: str):
+    return await _autocomplete_choices(interaction, "vips", current, 1)
+
+async def backup_id_autocomplete(interaction, current: str):
+    return await _autocomplete_choices(interaction, "vip_backup", current, 0)
+
+@bot.tree.command(name="check_vip", description="Sucht einen VIP anhand eines Teils des Namens.")
+@app_commands.describe(name="Name oder Teil des Namens")
+@app_commands.autocomplete(name=vip_name_autocomplete)
+@check_allowed_roles_slash()
+async def check_vip_slash(interaction: discord.Interaction, name: str):
+    await interaction.response.defer(thinking=True)
+    await _check_vip(_interaction_reply(interaction), name)
+
+@bot.tree.command(name="restore_vip", description="Stellt einen gelöschten VIP aus dem Backup wieder her.")
+@app_commands.describe(player_id="Player-ID des gelöschten VIPs")
+@app_commands.autocomplete(player_id=backup_id_autocomplete)
+@check_allowed_roles_slash()
+async def restore_vip_slash(interaction: discord.Interaction, player_id: str):
+    await interaction.response.defer(thinking=True)
+    await _restore_vip(_interaction_reply(interaction), player_id)
+
+@bot.tree.command(name="sync_vips", description="Berechnet die Änderungen zwischen Haupt- und Zielserver.")
+@check_allowed_roles_slash()
+async def sync_vips_slash(interaction: discord.Interaction):
+    await interaction.response.defer(thinking=True)
+    await _sync_vips(_interaction_reply(interaction), interaction.channel_id)
+
+@bot.tree.command(name="apply_sync", description="Überträgt die geplanten Änderungen an den Zielserver.")
+@check_allowed_roles_slash()
+async def apply_sync_slash(interaction: discord.Interaction):
+    await interaction.response.defer(thinking=True)
+    await _apply_sync(_interaction_reply(interaction), interaction.channel_id)
+
+@bot.tree.command(name="export_vips", description="Exportiert die aktuelle VIP-Liste als Datei.")
+@check_allowed_roles_slash()
+async def export_vips_slash(interaction: discord.Interaction):
+    await interaction.response.defer(thinking=True)
+    await _export_vips(_interaction_reply(interaction), interaction.channel_id)
+
+@bot.tree.command(name="apply_status", description="Zeigt den offenen Rest des Sync-Plans.")
+@check_allowed_roles_slash()
+async def apply_status_slash(interaction: discord.Interaction):
+    await interaction.response.send_message(embed=_apply_status_embed())
+
+@bot.tree.error
+async def on_app_command_error(interaction: discord.Interaction, error):
+    if isinstance(error, app_commands.CheckFailure):
+        message = "❌ Du hast keine Berechtigung für diesen Befehl."
+    else:
+        log_to_file(f"Fehler bei Slash-Befehl: {str(error)}", level="ERROR")
+        message = f"❌ Ein Fehler ist aufgetreten: `{str(error)}`"
+    if interaction.response.is_done():
+        await interaction.followup.send(message, ephemeral=True)
+    else:
+        await interaction.response.send_message(message, ephemeral=True)
+
 @bot.event
 async def on_ready():
     print(f"✅ Bot ist eingeloggt als {bot.user.name}")
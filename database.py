@@ -1,36 +1,159 @@
 import sqlite3
 import os
 import datetime
+import hashlib
+import itertools
+import zlib
+
+# Aktionen, die im Sync-Plan gespeichert werden
+SYNC_ACTIONS = ("add", "remove", "update")
+PLAN_BATCH_SIZE = 5000  # Zeilen pro executemany beim Speichern des Plans
+# Reihenfolge der Plan-Einträge bei gedrosselter Übertragung
+PLAN_ORDERS = {
+    "adds_first": "CASE action WHEN 'add' THEN 0 WHEN 'update' THEN 1 ELSE 2 END, player_id",
+    "expiring_first": "expiration, player_id",
+}
+
+# Tabellen mit VIP-Zeilen, für die Bucket-Hashes gepflegt werden
+VIP_TABLES = ("vips", "receiver_vips")
+BUCKET_COUNT = 256
+EMPTY_BUCKET_HASH = hashlib.sha256(b"").hexdigest()
+
+def vip_bucket(player_id):
+    """Ordnet eine `player_id` über ihren Hash einem von BUCKET_COUNT Buckets zu."""
+    return int.from_bytes(hashlib.sha256(player_id.encode("utf-8")).digest()[:4], "big") % BUCKET_COUNT
+
+def _insert_vip_sql(table):
+    return f"""
+    INSERT OR REPLACE INTO {table} (player_id, description, expiration, bucket)
+    VALUES (?1, ?2, ?3, vip_bucket(?1))
+    """
 
 class Database:
     def __init__(self, db_file):
         self.db_file = db_file
-        self.conn = sqlite3.connect(self.db_file)
+        # Bot und Sync-Worker teilen sich die Datei: WAL erlaubt parallele Leser, `timeout` wartet auf Schreibsperren
+        self.conn = sqlite3.connect(self.db_file, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.create_function("vip_bucket", 1, vip_bucket, deterministic=True)
         self.cursor = self.conn.cursor()
 
     def setup_tables(self):
         """Erstellt die notwendigen Tabellen, falls sie nicht existieren."""
+        for table in VIP_TABLES:
+            self.cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                player_id TEXT PRIMARY KEY,
+                description TEXT,
+                expiration TEXT,
+                bucket INTEGER
+            )
+            """)
+            # Bestehende Tabellen um die Bucket-Spalte ergänzen
+            columns = [row[1] for row in self.cursor.execute(f"PRAGMA table_info({table})").fetchall()]
+            if "bucket" not in columns:
+                self.cursor.execute(f"ALTER TABLE {table} ADD COLUMN bucket INTEGER")
+                self.cursor.execute(f"UPDATE {table} SET bucket = vip_bucket(player_id)")
+            # Deckender Index: Bucket-Hashes und Bucket-Diff lesen nur aus dem Index
+            self.cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS idx_{table}_bucket ON {table} (bucket, player_id, description, expiration)"
+            )
         self.cursor.execute("""
-        CREATE TABLE IF NOT EXISTS vips (
-            player_id TEXT PRIMARY KEY,
-            description TEXT,
-            expiration TEXT
+        CREATE TABLE IF NOT EXISTS bucket_hashes (
+            table_name TEXT NOT NULL,
+            bucket INTEGER NOT NULL,
+            bucket_hash TEXT NOT NULL,
+            PRIMARY KEY (table_name, bucket)
         )
         """)
+        # Alte `sync`-Tabellen ohne Aktionsspalte verwerfen (der Plan lässt sich neu berechnen)
+        columns = [row[1] for row in self.cursor.execute("PRAGMA table_info(sync)").fetchall()]
+        if columns and "action" not in columns:
+            self.cursor.execute("DROP TABLE sync")
         self.cursor.execute("""
-        CREATE TABLE IF NOT EXISTS receiver_vips (
+        CREATE TABLE IF NOT EXISTS sync (
             player_id TEXT PRIMARY KEY,
             description TEXT,
-            expiration TEXT
+            expiration TEXT,
+            action TEXT NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0
         )
         """)
+        # Fehlversuche je Eintrag für die gedrosselte Übertragung
+        if "attempts" not in [row[1] for row in self.cursor.execute("PRAGMA table_info(sync)").fetchall()]:
+            self.cursor.execute("ALTER TABLE sync ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_sync_action ON sync (action)")
         self.cursor.execute("""
-        CREATE TABLE IF NOT EXISTS sync (
-            player_id TEXT PRIMARY KEY,
+        CREATE TABLE IF NOT EXISTS sync_plan (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            source_hash TEXT,
+            target_hash TEXT,
+            created_at TEXT
+        )
+        """)
+        self.cursor.execute("""
+        CREATE TABLE IF NOT EXISTS table_state (
+            table_name TEXT PRIMARY KEY,
+            content_hash TEXT
+        )
+        """)
+        self.cursor.execute("""
+        CREATE TABLE IF NOT EXISTS snapshot_blobs (
+            blob_hash TEXT PRIMARY KEY,
+            data BLOB NOT NULL,
+            size INTEGER NOT NULL
+        )
+        """)
+        self.cursor.execute("""
+        CREATE TABLE IF NOT EXISTS snapshots (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            source TEXT NOT NULL,
+            blob_hash TEXT NOT NULL,
+            parser_key TEXT,
+            base_hash TEXT,
+            parsed_hash TEXT,
+            fetched_at TEXT,
+            last_seen_at TEXT
+        )
+        """)
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_snapshots_source ON snapshots (source, id)")
+        self.cursor.execute("""
+        CREATE TABLE IF NOT EXISTS vip_changes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            snapshot_id INTEGER NOT NULL,
+            player_id TEXT NOT NULL,
+            change TEXT NOT NULL,
             description TEXT,
             expiration TEXT
         )
         """)
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_vip_changes_snapshot ON vip_changes (snapshot_id)")
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_vip_changes_player ON vip_changes (player_id)")
+        self.cursor.execute("""
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'queued',
+            channel_id INTEGER,
+            created_at TEXT,
+            finished_at TEXT,
+            reported INTEGER NOT NULL DEFAULT 0
+        )
+        """)
+        # Bestehende Job-Tabellen um die Spalte `reported` ergänzen; alte Jobs gelten als gemeldet
+        columns = [row[1] for row in self.cursor.execute("PRAGMA table_info(jobs)").fetchall()]
+        if "reported" not in columns:
+            self.cursor.execute("ALTER TABLE jobs ADD COLUMN reported INTEGER NOT NULL DEFAULT 0")
+            self.cursor.execute("UPDATE jobs SET reported = 1 WHERE status IN ('done', 'failed')")
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, id)")
+        self.cursor.execute("""
+        CREATE TABLE IF NOT EXISTS job_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            job_id INTEGER NOT NULL,
+            message TEXT,
+            created_at TEXT
+        )
+        """)
         self.cursor.execute("""
         CREATE TABLE IF NOT EXISTS vip_backup (
             player_id TEXT PRIMARY KEY,
@@ -49,22 +172,485 @@ class Database:
 
     def bulk_insert(self, table, data):
         """Fügt mehrere Einträge in eine Tabelle ein."""
-        self.cursor.executemany(f"""
-        INSERT OR REPLACE INTO {table} (player_id, description, expiration)
-        VALUES (?, ?, ?)
-        """, data)
+        if table in VIP_TABLES:
+            self.cursor.executemany(_insert_vip_sql(table), data)
+        else:
+            self.cursor.executemany(f"""
+            INSERT OR REPLACE INTO {table} (player_id, description, expiration)
+            VALUES (?, ?, ?)
+            """, data)
+        self._invalidate_hash(table)
         self.conn.commit()
 
     def delete_all(self, table):
         """Löscht alle Einträge aus einer Tabelle."""
         self.cursor.execute(f"DELETE FROM {table}")
+        if table == "sync":
+            self.cursor.execute("DELETE FROM sync_plan")
+        self._invalidate_hash(table)
         self.conn.commit()
 
+    def replace_table(self, table, data):
+        """Ersetzt den Inhalt einer VIP-Tabelle in einer Transaktion und speichert den neuen Inhalts-Hash."""
+        with self.conn:
+            self.conn.execute(f"DELETE FROM {table}")
+            self.conn.executemany(_insert_vip_sql(table), data)
+            self._update_bucket_hashes(table)
+
+    def _update_bucket_hashes(self, table, buckets=None):
+        """Berechnet die Bucket-Hashes (alle oder nur `buckets`) und den daraus abgeleiteten Inhalts-Hash neu.
+
+        Jeder Bucket-Hash ist ein SHA-256 über die Zeilen des Buckets, sortiert nach `player_id`;
+        der Inhalts-Hash der Tabelle ist ein SHA-256 über alle Bucket-Hashes (Merkle-Wurzel).
+        Läuft innerhalb der Transaktion des Aufrufers. Gibt den Inhalts-Hash zurück.
+        """
+        query = f"SELECT bucket, player_id, description, expiration FROM {table}"
+        params = ()
+        if buckets is None:
+            self.conn.execute("DELETE FROM bucket_hashes WHERE table_name = ?", (table,))
+        else:
+            buckets = sorted(set(buckets))
+            placeholders = ", ".join("?" for _ in buckets)
+            self.conn.execute(
+                f"DELETE FROM bucket_hashes WHERE table_name = ? AND bucket IN ({placeholders})", (table, *buckets)
+            )
+            query += f" WHERE bucket IN ({placeholders})"
+            params = tuple(buckets)
+        query += " ORDER BY bucket, player_id"
+
+        rows = self.conn.execute(query, params)
+        for bucket, bucket_rows in itertools.groupby(rows, key=lambda row: row[0]):
+            digest = hashlib.sha256()
+            for _, *values in bucket_rows:
+                digest.update("\x1f".join(value or "" for value in values).encode("utf-8"))
+                digest.update(b"\n")
+            self.conn.execute(
+                "INSERT INTO bucket_hashes (table_name, bucket, bucket_hash) VALUES (?, ?, ?)",
+                (table, bucket, digest.hexdigest())
+            )
+
+        bucket_hashes = self._fetch_bucket_hashes(table)
+        root = hashlib.sha256()
+        for bucket in range(BUCKET_COUNT):
+            root.update(bucket_hashes.get(bucket, EMPTY_BUCKET_HASH).encode("ascii"))
+        content_hash = root.hexdigest()
+        self.conn.execute(
+            "INSERT OR REPLACE INTO table_state (table_name, content_hash) VALUES (?, ?)",
+            (table, content_hash)
+        )
+        return content_hash
+
+    def _fetch_bucket_hashes(self, table):
+        return dict(self.conn.execute(
+            "SELECT bucket, bucket_hash FROM bucket_hashes WHERE table_name = ?", (table,)
+        ).fetchall())
+
+    def _invalidate_hash(self, table):
+        self.cursor.execute("DELETE FROM table_state WHERE table_name = ?", (table,))
+
+    def content_hash(self, table):
+        """Gibt den Inhalts-Hash einer Tabelle zurück; wird nur nach Änderungen neu berechnet."""
+        row = self.conn.execute("SELECT content_hash FROM table_state WHERE table_name = ?", (table,)).fetchone()
+        if row:
+            return row[0]
+        with self.conn:
+            return self._update_bucket_hashes(table)
+
+    def bucket_hashes(self, table):
+        """Gibt {bucket: hash} der nicht leeren Buckets einer VIP-Tabelle zurück."""
+        self.content_hash(table)  # stellt sicher, dass die Bucket-Hashes aktuell sind
+        return self._fetch_bucket_hashes(table)
+
+    def diff_buckets(self, source_table, target_table):
+        """Gibt die sortierten Buckets zurück, deren Hashes sich zwischen beiden Tabellen unterscheiden."""
+        source = self.bucket_hashes(source_table)
+        target = self.bucket_hashes(target_table)
+        return sorted(bucket for bucket in source.keys() | target.keys() if source.get(bucket) != target.get(bucket))
+
+    def save_sync_plan(self, plan, source_hash, target_hash):
+        """Speichert einen Sync-Plan aus (player_id, description, expiration, action)-Zeilen samt Snapshot-Hashes.
+
+        `plan` darf ein Generator sein (z. B. `iter_diff`); er wird in Batches geschrieben.
+        Gibt die Anzahl der Einträge je Aktion zurück.
+        """
+        timestamp = datetime.datetime.utcnow().isoformat()
+        plan = iter(plan)
+        with self.conn:
+            self.conn.execute("DELETE FROM sync")
+            while batch := list(itertools.islice(plan, PLAN_BATCH_SIZE)):
+                self.conn.executemany("""
+                INSERT OR REPLACE INTO sync (player_id, description, expiration, action)
+                VALUES (?, ?, ?, ?)
+                """, batch)
+            self.conn.execute("""
+            INSERT OR REPLACE INTO sync_plan (id, source_hash, target_hash, created_at)
+            VALUES (1, ?, ?, ?)
+            """, (source_hash, target_hash, timestamp))
+        return self.sync_plan_counts()
+
+    def iter_diff(self, source_table, target_table):
+        """Vergleicht zwei VIP-Tabellen, besucht dabei aber nur Buckets mit unterschiedlichem Hash.
+
+        Liefert Plan-Zeilen (player_id, description, expiration, action).
+        """
+        for bucket in self.diff_buckets(source_table, target_table):
+            yield from self._merge_bucket(source_table, target_table, bucket)
+
+    def _merge_bucket(self, source_table, target_table, bucket):
+        """Merge-Join eines Buckets über zwei nach `player_id` sortierte Cursor.
+
+        Beide Cursor laufen über den deckenden Bucket-Index, es liegt immer nur eine Zeile
+        pro Tabelle im Speicher.
+        """
+        query = "SELECT player_id, description, expiration FROM {} WHERE bucket = ? ORDER BY player_id"
+        source = self.conn.execute(query.format(source_table), (bucket,))
+        target = self.conn.execute(query.format(target_table), (bucket,))
+        source_row = next(source, None)
+        target_row = next(target, None)
+
+        while source_row is not None or target_row is not None:
+            if target_row is None or (source_row is not None and source_row[0] < target_row[0]):
+                yield source_row + ("add",)
+                source_row = next(source, None)
+            elif source_row is None or target_row[0] < source_row[0]:
+                yield target_row + ("remove",)
+                target_row = next(target, None)
+            else:
+                if source_row[1] != target_row[1] or source_row[2] != target_row[2]:
+                    yield source_row + ("update",)
+                source_row = next(source, None)
+                target_row = next(target, None)
+
+    def get_sync_plan(self):
+        """Gibt (source_hash, target_hash, created_at) des gespeicherten Plans zurück oder None."""
+        return self.conn.execute("SELECT source_hash, target_hash, created_at FROM sync_plan WHERE id = 1").fetchone()
+
+    def is_sync_plan_stale(self):
+        """True, wenn `vips` oder `receiver_vips` sich seit der Planerstellung geändert haben."""
+        plan = self.get_sync_plan()
+        if plan is None:
+            return True
+        source_hash, target_hash, _ = plan
+        return source_hash != self.content_hash("vips") or target_hash != self.content_hash("receiver_vips")
+
+    def iter_sync_plan(self, *actions):
+        """Liefert die Plan-Einträge der angegebenen Aktionen als Stream (sortiert nach `player_id`)."""
+        actions = actions or SYNC_ACTIONS
+        placeholders = ", ".join("?" for _ in actions)
+        yield from self.conn.execute(f"""
+        SELECT player_id, description, expiration, action FROM sync
+        WHERE action IN ({placeholders}) ORDER BY player_id
+        """, actions)
+
+    def fetch_sync_plan_batch(self, order, limit):
+        """Gibt die nächsten `limit` Plan-Einträge in der Reihenfolge `order` (siehe PLAN_ORDERS) zurück.
+
+        Einträge mit weniger Fehlversuchen kommen zuerst, damit fehlschlagende Einträge den Rest nicht blockieren.
+        """
+        return self.conn.execute(f"""
+        SELECT player_id, description, expiration, action FROM sync
+        ORDER BY attempts, {PLAN_ORDERS[order]} LIMIT ?
+        """, (limit,)).fetchall()
+
+    def advance_sync_plan(self, done, failed, max_attempts):
+        """Entfernt abgearbeitete Einträge aus dem Plan und führt `receiver_vips` für die erfolgreichen nach.
+
+        `failed` enthält (Zeile, offene Aktion): Fehlgeschlagene Einträge bleiben mit der noch offenen
+        Aktion im Plan und werden erneut versucht. Ist bei einer Aktualisierung nur das Entfernen
+        gelungen, bleibt ein `add`. Nach `max_attempts` Fehlversuchen wird ein Eintrag verworfen.
+        Der Ziel-Hash des Plans wird mitgeführt, damit der Rest-Plan nicht als veraltet gilt.
+        Gibt die Anzahl der verworfenen Einträge zurück.
+        """
+        upserts = [row[:3] for row in done if row[3] in ("add", "update")]
+        removals = [row[0] for row in done if row[3] == "remove"]
+        removals += [row[0] for row, action in failed if row[3] == "update" and action == "add"]
+        if upserts or removals:
+            self.apply_to_table("receiver_vips", upserts, removals)
+        target_hash = self.content_hash("receiver_vips")
+        with self.conn:
+            self.conn.executemany("DELETE FROM sync WHERE player_id = ?", [(row[0],) for row in done])
+            self.conn.executemany(
+                "UPDATE sync SET action = ?, attempts = attempts + 1 WHERE player_id = ?",
+                [(action, row[0]) for row, action in failed]
+            )
+            dropped = self.conn.execute("DELETE FROM sync WHERE attempts >= ?", (max_attempts,)).rowcount
+            self.conn.execute("UPDATE sync_plan SET target_hash = ? WHERE id = 1", (target_hash,))
+        return dropped
+
+    def sync_plan_counts(self):
+        """Gibt die Anzahl der Plan-Einträge je Aktion zurück."""
+        counts = dict.fromkeys(SYNC_ACTIONS, 0)
+        counts.update(self.conn.execute("SELECT action, COUNT(*) FROM sync GROUP BY action").fetchall())
+        return counts
+
+    def store_blob(self, raw):
+        """Speichert eine Rohantwort komprimiert unter ihrem SHA-256 (identische Inhalte nur einmal)."""
+        blob_hash = hashlib.sha256(raw).hexdigest()
+        if self.conn.execute("SELECT 1 FROM snapshot_blobs WHERE blob_hash = ?", (blob_hash,)).fetchone():
+            return blob_hash
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR IGNORE INTO snapshot_blobs (blob_hash, data, size) VALUES (?, ?, ?)",
+                (blob_hash, zlib.compress(raw), len(raw))
+            )
+        return blob_hash
+
+    def load_blob(self, blob_hash):
+        """Gibt die entpackte Rohantwort zu einem Hash zurück oder None."""
+        row = self.conn.execute("SELECT data FROM snapshot_blobs WHERE blob_hash = ?", (blob_hash,)).fetchone()
+        return zlib.decompress(row[0]) if row else None
+
+    def latest_snapshot(self, source):
+        """Gibt (id, blob_hash, parser_key, base_hash, parsed_hash) des neuesten Snapshots einer Quelle zurück."""
+        return self.conn.execute("""
+        SELECT id, blob_hash, parser_key, base_hash, parsed_hash FROM snapshots
+        WHERE source = ? ORDER BY id DESC LIMIT 1
+        """, (source,)).fetchone()
+
+    def touch_snapshot(self, snapshot_id):
+        """Vermerkt, dass ein unveränderter Snapshot erneut abgerufen wurde."""
+        timestamp = datetime.datetime.utcnow().isoformat()
+        with self.conn:
+            self.conn.execute("UPDATE snapshots SET last_seen_at = ? WHERE id = ?", (timestamp, snapshot_id))
+
+    def ingest_snapshot(self, source, blob_hash, parser_key, table, data):
+        """Ersetzt `table` durch einen neuen Snapshot und schreibt die Änderungen in den Change-Feed.
+
+        Der Vergleich mit dem bisherigen Tabelleninhalt läuft vollständig in SQLite. Gibt die Snapshot-ID zurück.
+        """
+        timestamp = datetime.datetime.utcnow().isoformat()
+        base_hash = self.content_hash(table)
+        with self.conn:
+            # Nicht DROP: SQLite verweigert das, solange ein anderer Cursor der Verbindung offen ist (z. B. Apply)
+            self.conn.execute("""
+            CREATE TEMP TABLE IF NOT EXISTS incoming (
+                player_id TEXT PRIMARY KEY,
+                description TEXT,
+                expiration TEXT
+            )
+            """)
+            self.conn.execute("DELETE FROM temp.incoming")
+            self.conn.executemany("INSERT OR REPLACE INTO temp.incoming VALUES (?, ?, ?)", data)
+            snapshot_id = self.conn.execute("""
+            INSERT INTO snapshots (source, blob_hash, parser_key, base_hash, fetched_at, last_seen_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """, (source, blob_hash, parser_key, base_hash, timestamp, timestamp)).lastrowid
+
+            self.conn.execute(f"""
+            INSERT INTO vip_changes (snapshot_id, player_id, change, description, expiration)
+            SELECT ?, i.player_id, 'added', i.description, i.expiration
+            FROM temp.incoming i LEFT JOIN {table} t ON t.player_id = i.player_id
+            WHERE t.player_id IS NULL
+            """, (snapshot_id,))
+            self.conn.execute(f"""
+            INSERT INTO vip_changes (snapshot_id, player_id, change, description, expiration)
+            SELECT ?, t.player_id, 'removed', t.description, t.expiration
+            FROM {table} t LEFT JOIN temp.incoming i ON i.player_id = t.player_id
+            WHERE i.player_id IS NULL
+            """, (snapshot_id,))
+            self.conn.execute(f"""
+            INSERT INTO vip_changes (snapshot_id, player_id, change, description, expiration)
+            SELECT ?, i.player_id, 'changed', i.description, i.expiration
+            FROM temp.incoming i JOIN {table} t ON t.player_id = i.player_id
+            WHERE t.description IS NOT i.description OR t.expiration IS NOT i.expiration
+            """, (snapshot_id,))
+
+            self.conn.execute(f"DELETE FROM {table}")
+            self.conn.execute(f"""
+            INSERT INTO {table} (player_id, description, expiration, bucket)
+            SELECT player_id, description, expiration, vip_bucket(player_id) FROM temp.incoming
+            """)
+            self.conn.execute("DELETE FROM temp.incoming")
+
+            parsed_hash = self._update_bucket_hashes(table)
+            self.conn.execute("UPDATE snapshots SET parsed_hash = ? WHERE id = ?", (parsed_hash, snapshot_id))
+        return snapshot_id
+
+    def fetch_changes(self, snapshot_id):
+        """Gibt den Change-Feed eines Snapshots als (player_id, change, description, expiration) zurück."""
+        return self.conn.execute("""
+        SELECT player_id, change, description, expiration FROM vip_changes
+        WHERE snapshot_id = ? ORDER BY player_id
+        """, (snapshot_id,)).fetchall()
+
+    def changed_player_ids_since(self, source, snapshot_id):
+        """Gibt alle `player_id`s zurück, die sich in Snapshots nach `snapshot_id` geändert haben."""
+        return [row[0] for row in self.conn.execute("""
+        SELECT DISTINCT vip_changes.player_id FROM vip_changes
+        JOIN snapshots ON snapshots.id = vip_changes.snapshot_id
+        WHERE snapshots.source = ? AND snapshots.id > ?
+        ORDER BY vip_changes.player_id
+        """, (source, snapshot_id))]
+
+    def fetch_vip(self, table, player_id):
+        """Gibt (player_id, description, expiration) eines VIPs oder None zurück."""
+        return self.conn.execute(
+            f"SELECT player_id, description, expiration FROM {table} WHERE player_id = ?", (player_id,)
+        ).fetchone()
+
+    def apply_to_table(self, table, upserts, removals):
+        """Überträgt angewendete Änderungen auf eine VIP-Tabelle (z. B. `receiver_vips` nach einem Teil-Sync).
+
+        Nur die Bucket-Hashes der betroffenen Buckets werden neu berechnet.
+        """
+        cached = self.conn.execute("SELECT 1 FROM table_state WHERE table_name = ?", (table,)).fetchone()
+        with self.conn:
+            self.conn.executemany(_insert_vip_sql(table), upserts)
+            self.conn.executemany(f"DELETE FROM {table} WHERE player_id = ?", [(player_id,) for player_id in removals])
+            if cached:
+                touched = [vip_bucket(row[0]) for row in upserts] + [vip_bucket(player_id) for player_id in removals]
+                self._update_bucket_hashes(table, touched)
+            else:
+                self.conn.execute("DELETE FROM table_state WHERE table_name = ?", (table,))
+
+    def fetch_change_history(self, player_id=None, limit=15):
+        """Gibt die letzten Änderungen als (fetched_at, player_id, change, description, expiration) zurück."""
+        query = """
+        SELECT snapshots.fetched_at, vip_changes.player_id, vip_changes.change,
+               vip_changes.description, vip_changes.expiration
+        FROM vip_changes JOIN snapshots ON snapshots.id = vip_changes.snapshot_id
+        """
+        params = ()
+        if player_id:
+            query += " WHERE vip_changes.player_id = ?"
+            params = (player_id,)
+        query += " ORDER BY vip_changes.id DESC LIMIT ?"
+        return self.conn.execute(query, params + (limit,)).fetchall()
+
+    def prune_snapshots(self, source, keep):
+        """Löscht alte Snapshots samt Change-Feed und nicht mehr referenzierte Rohdaten."""
+        with self.conn:
+            old_ids = [row[0] for row in self.conn.execute(
+                "SELECT id FROM snapshots WHERE source = ? ORDER BY id DESC LIMIT -1 OFFSET ?", (source, keep)
+            )]
+            if not old_ids:
+                return
+            self.conn.executemany("DELETE FROM vip_changes WHERE snapshot_id = ?", [(i,) for i in old_ids])
+            self.conn.executemany("DELETE FROM snapshots WHERE id = ?", [(i,) for i in old_ids])
+            self.conn.execute(
+                "DELETE FROM snapshot_blobs WHERE blob_hash NOT IN (SELECT blob_hash FROM snapshots)"
+            )
+
     def fetch_all(self, table):
         """Gibt alle Daten aus einer Tabelle zurück."""
-        self.cursor.execute(f"SELECT * FROM {table}")
+        if table in VIP_TABLES:
+            self.cursor.execute(f"SELECT player_id, description, expiration FROM {table}")
+        elif table == "sync":
+            # Ohne die interne Spalte `attempts` der gedrosselten Übertragung
+            self.cursor.execute("SELECT player_id, description, expiration, action FROM sync")
+        else:
+            self.cursor.execute(f"SELECT * FROM {table}")
         return self.cursor.fetchall()
 
+    def iter_search_rows(self, table):
+        """Liefert (player_id, description) aller Zeilen von `vips` oder `vip_backup` für den Suchindex."""
+        yield from self.conn.execute(f"SELECT player_id, description FROM {table}")
+
+    def search_index_version(self):
+        """Kennung des aktuellen Stands von `vips` und `vip_backup`; ändert sich bei jedem Schreibzugriff."""
+        return self.conn.execute("""
+        SELECT (SELECT content_hash FROM table_state WHERE table_name = 'vips'),
+               (SELECT COUNT(*) FROM vips),
+               (SELECT COUNT(*) FROM vip_backup),
+               (SELECT MAX(deleted_at) FROM vip_backup)
+        """).fetchone()
+
+    def enqueue_job(self, kind, channel_id=None):
+        """Stellt einen Job für den Sync-Worker in die Warteschlange und gibt die Job-ID zurück."""
+        timestamp = datetime.datetime.utcnow().isoformat()
+        with self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO jobs (kind, status, channel_id, created_at) VALUES (?, 'queued', ?, ?)",
+                (kind, channel_id, timestamp)
+            )
+        return cursor.lastrowid
+
+    def claim_next_job(self):
+        """Markiert den ältesten wartenden Job als `running` und gibt (id, kind, channel_id) zurück oder None."""
+        with self.conn:
+            job = self.conn.execute(
+                "SELECT id, kind, channel_id FROM jobs WHERE status = 'queued' ORDER BY id LIMIT 1"
+            ).fetchone()
+            if job is None:
+                return None
+            updated = self.conn.execute(
+                "UPDATE jobs SET status = 'running' WHERE id = ? AND status = 'queued'", (job[0],)
+            ).rowcount
+        return job if updated else None
+
+    def start_job(self, kind, channel_id=None):
+        """Legt einen Job an, der direkt im Worker läuft (ohne Warteschlange), und gibt die Job-ID zurück."""
+        timestamp = datetime.datetime.utcnow().isoformat()
+        with self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO jobs (kind, status, channel_id, created_at) VALUES (?, 'running', ?, ?)",
+                (kind, channel_id, timestamp)
+            )
+        return cursor.lastrowid
+
+    def finish_job(self, job_id, success):
+        """Schließt einen Job als `done` oder `failed` ab."""
+        timestamp = datetime.datetime.utcnow().isoformat()
+        with self.conn:
+            self.conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ? WHERE id = ?",
+                ("done" if success else "failed", timestamp, job_id)
+            )
+
+    def reset_running_jobs(self):
+        """Setzt nach einem Absturz des Workers hängengebliebene Jobs auf `failed`."""
+        with self.conn:
+            self.conn.execute("UPDATE jobs SET status = 'failed' WHERE status = 'running'")
+
+    def get_job_status(self, job_id):
+        row = self.conn.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return row[0] if row else None
+
+    def add_job_event(self, job_id, message):
+        """Speichert eine Fortschrittsmeldung eines Jobs."""
+        timestamp = datetime.datetime.utcnow().isoformat()
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO job_events (job_id, message, created_at) VALUES (?, ?, ?)",
+                (job_id, message, timestamp)
+            )
+
+    def fetch_job_events(self, after_id):
+        """Gibt neue Meldungen als (event_id, job_id, kind, channel_id, message) zurück."""
+        return self.conn.execute("""
+        SELECT job_events.id, jobs.id, jobs.kind, jobs.channel_id, job_events.message
+        FROM job_events JOIN jobs ON jobs.id = job_events.job_id
+        WHERE job_events.id > ? ORDER BY job_events.id
+        """, (after_id,)).fetchall()
+
+    def fetch_unreported_jobs(self):
+        """Gibt abgeschlossene, noch nicht gemeldete Jobs als (id, kind, status, channel_id) zurück.
+
+        Jobs werden explizit als gemeldet markiert, da sie nicht in ID-Reihenfolge fertig werden
+        (z. B. ein dosierter Apply-Job vor einem länger laufenden Sync-Job).
+        """
+        return self.conn.execute("""
+        SELECT id, kind, status, channel_id FROM jobs
+        WHERE status IN ('done', 'failed') AND reported = 0 ORDER BY id
+        """).fetchall()
+
+    def is_job_reported(self, job_id):
+        row = self.conn.execute("SELECT reported FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return bool(row and row[0])
+
+    def mark_job_reported(self, job_id):
+        with self.conn:
+            self.conn.execute("UPDATE jobs SET reported = 1 WHERE id = ?", (job_id,))
+
+    def mark_finished_jobs_reported(self):
+        """Markiert alle bereits abgeschlossenen Jobs als gemeldet (beim Start des Bots)."""
+        with self.conn:
+            self.conn.execute("UPDATE jobs SET reported = 1 WHERE status IN ('done', 'failed') AND reported = 0")
+
+    def last_job_event_id(self):
+        row = self.conn.execute("SELECT MAX(id) FROM job_events").fetchone()
+        return row[0] or 0
+
     def backup_vip(self, player_id, description, expiration):
         """Speichert gelöschte VIPs in der Backup-Tabelle und ersetzt vorhandene Einträge."""
         timestamp = datetime.datetime.utcnow().isoformat()
@@ -80,7 +666,8 @@ class Database:
             return None
         
         player_id, description, expiration, deleted_at = result[0]
-        self.execute_query("INSERT INTO vips (player_id, description, expiration) VALUES (?, ?, ?)", (player_id, description, expiration))
+        self.execute_query("INSERT INTO vips (player_id, description, expiration, bucket) VALUES (?1, ?2, ?3, vip_bucket(?1))", (player_id, description, expiration))
+        self._invalidate_hash("vips")
         self.execute_query("DELETE FROM vip_backup WHERE player_id = ?", (player_id,))
         return (player_id, description, expiration)
 
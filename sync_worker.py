@@ -0,0 +1,102 @@
+import os
+import asyncio
+from vip_sync import (
+    db, run_job, setup_logging, log_to_file, pipeline_lock, close_api_clients,
+    apply_changes_since, watch_main_changes, apply_paced_tick, run_paced_apply,
+    AUTO_SYNC_INTERVAL, CHANGE_POLL_INTERVAL, APPLY_RPS,
+)
+
+WORKER_LOG_FILE = "sync_worker.log"
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", 2))  # In Sekunden
+REPORT_TIMEOUT = 60  # Sekunden, die nach einem `auto`-Sync höchstens auf den Sync-Report des Bots gewartet wird
+
+pending_applies = set()  # Laufende `queue_auto_apply`-Tasks (Referenz, damit sie nicht eingesammelt werden)
+
+
+async def process_job(job_id, kind):
+    """Führt einen Job aus und schreibt seine Fortschrittsmeldungen in `job_events`."""
+    async def progress(message):
+        db.add_job_event(job_id, message)
+
+    log_to_file(f"⚙️ Job #{job_id} ({kind}) gestartet.", level="INFO")
+    try:
+        async with pipeline_lock:
+            success = await run_job(kind, progress)
+    except Exception as e:
+        log_to_file(f"❌ Job #{job_id} ({kind}) fehlgeschlagen: {str(e)}", level="ERROR")
+        db.add_job_event(job_id, f"❌ Job fehlgeschlagen: {str(e)}")
+        success = False
+    db.finish_job(job_id, success)
+    log_to_file(f"⚙️ Job #{job_id} ({kind}) beendet: {'erfolgreich' if success else 'fehlgeschlagen'}.", level="INFO")
+    if kind == "auto" and success and sum(db.sync_plan_counts().values()):
+        # Im Hintergrund, damit die Warteschlange während des Wartens auf den Report weiterläuft
+        task = asyncio.create_task(queue_auto_apply(job_id))
+        pending_applies.add(task)
+        task.add_done_callback(pending_applies.discard)
+
+async def queue_auto_apply(job_id):
+    """Reiht nach dem Sync eines `auto`-Jobs das Apply ein, sobald der Bot den Sync-Report gesendet hat.
+
+    Das Apply leert die `sync`-Tabelle; ohne Warten fände der Bot keinen Plan mehr für den Report.
+    Läuft kein Bot, wird nach REPORT_TIMEOUT trotzdem übertragen.
+    """
+    waited = 0
+    while not db.is_job_reported(job_id) and waited < REPORT_TIMEOUT:
+        await asyncio.sleep(JOB_POLL_INTERVAL)
+        waited += JOB_POLL_INTERVAL
+    db.enqueue_job("apply")
+
+async def schedule_auto_sync():
+    """Stellt im Intervall aus der .env-Datei einen `auto`-Job (Sync, danach Apply) ein."""
+    while True:
+        log_to_file(f"⏳ Automatische VIP-Synchronisation eingereiht (Intervall: {AUTO_SYNC_INTERVAL} Stunden)...", level="INFO")
+        db.enqueue_job("auto")
+        await asyncio.sleep(AUTO_SYNC_INTERVAL * 3600)
+
+async def apply_watched_changes(snapshot_id):
+    """Überträgt vom Change-Watcher erkannte Änderungen als eigener Job, damit der Bot die Meldungen weiterleitet."""
+    job_id = db.start_job("changes")
+
+    async def progress(message):
+        db.add_job_event(job_id, message)
+
+    success = await apply_changes_since(snapshot_id, progress)
+    db.finish_job(job_id, success)
+    return success
+
+async def apply_paced_batch():
+    """Führt einen gedrosselten Übertragungs-Durchlauf als eigenen Job aus, damit der Bot die Meldungen weiterleitet."""
+    job_id = db.start_job("paced")
+
+    async def progress(message):
+        db.add_job_event(job_id, message)
+
+    result = await apply_paced_tick(progress)
+    db.finish_job(job_id, result is not None)
+    return result
+
+async def main():
+    """Arbeitet die Job-Warteschlange nacheinander ab, damit sich Tabellen-Updates nie überschneiden."""
+    db.reset_running_jobs()
+    scheduler = asyncio.create_task(schedule_auto_sync())
+    watcher = asyncio.create_task(watch_main_changes(apply_watched_changes)) if CHANGE_POLL_INTERVAL else None
+    pacer = asyncio.create_task(run_paced_apply(apply_paced_batch)) if APPLY_RPS else None
+    try:
+        while True:
+            job = db.claim_next_job()
+            if job is None:
+                await asyncio.sleep(JOB_POLL_INTERVAL)
+                continue
+            job_id, kind, _ = job
+            await process_job(job_id, kind)
+    finally:
+        scheduler.cancel()
+        if watcher:
+            watcher.cancel()
+        if pacer:
+            pacer.cancel()
+        await close_api_clients()
+
+if __name__ == "__main__":
+    setup_logging(WORKER_LOG_FILE)
+    asyncio.run(main())
@@ -0,0 +1,96 @@
+import asyncio
+import bisect
+import re
+from array import array
+from database import Database
+from vip_sync import log_to_file
+
+SEARCH_TABLES = ("vips", "vip_backup")
+MAX_CHOICES = 25  # Discord erlaubt maximal 25 Autocomplete-Vorschläge
+WORD_PATTERN = re.compile(r"\w+")
+
+
+def _search_terms(player_id, description):
+    """Suchbegriffe einer Zeile: Player-ID, vollständige Beschreibung und jedes Wort daraus (klein geschrieben)."""
+    description = (description or "").lower()
+    terms = {player_id.lower(), description}
+    terms.update(WORD_PATTERN.findall(description))
+    terms.discard("")
+    return terms
+
+
+def _build_table_index(db, table):
+    """Baut den sortierten Präfix-Index einer Tabelle: (Begriffe, Zeilennummern, Zeilen)."""
+    rows = []
+    pairs = []
+    for player_id, description in db.iter_search_rows(table):
+        row_id = len(rows)
+        rows.append((player_id, description or ""))
+        pairs.extend((term, row_id) for term in _search_terms(player_id, description))
+    pairs.sort()
+    terms = [term for term, _ in pairs]
+    row_ids = array("I", (row_id for _, row_id in pairs))
+    return terms, row_ids, rows
+
+
+def build_search_index(db_file):
+    """Liest `vips` und `vip_backup` über eine eigene Verbindung ein (läuft in einem Thread)."""
+    db = Database(db_file)
+    try:
+        return {table: _build_table_index(db, table) for table in SEARCH_TABLES}
+    finally:
+        db.close()
+
+
+class VipSearchIndex:
+    """Präfix-Index über `vips` und `vip_backup` für Autocomplete.
+
+    Suchen sind binäre Suchen auf sortierten Begriffen und damit auch bei großen Listen schnell genug
+    für die Antwortfrist von Discord. Nach Änderungen an der Datenbank wird der Index im Hintergrund
+    neu gebaut; bis dahin antwortet der bisherige Stand.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.version = None
+        self.tables = {table: ([], array("I"), []) for table in SEARCH_TABLES}
+        self._rebuild = None
+
+    def refresh(self):
+        """Startet einen Neuaufbau, falls sich die Tabellen seit dem letzten Aufbau geändert haben."""
+        version = self.db.search_index_version()
+        if version != self.version and (self._rebuild is None or self._rebuild.done()):
+            self._rebuild = asyncio.create_task(self._build(version))
+        return self._rebuild
+
+    async def _build(self, version):
+        try:
+            self.tables = await asyncio.to_thread(build_search_index, self.db.db_file)
+            self.version = version
+        except Exception as e:
+            log_to_file(f"Fehler beim Aufbau des Suchindex: {str(e)}", level="ERROR")
+
+    async def search(self, table, prefix, timeout=2.0):
+        """Gibt bis zu MAX_CHOICES (player_id, description)-Treffer zurück, deren Begriffe mit `prefix` beginnen.
+
+        Existiert noch kein Index, wird höchstens `timeout` Sekunden auf den ersten Aufbau gewartet.
+        """
+        rebuild = self.refresh()
+        if self.version is None and rebuild is not None:
+            try:
+                await asyncio.wait_for(asyncio.shield(rebuild), timeout)
+            except asyncio.TimeoutError:
+                return []
+
+        terms, row_ids, rows = self.tables[table]
+        prefix = prefix.strip().lower()
+        results = []
+        seen = set()
+        for position in range(bisect.bisect_left(terms, prefix), len(terms)):
+            if not terms[position].startswith(prefix) or len(results) >= MAX_CHOICES:
+                break
+            row_id = row_ids[position]
+            if row_id not in seen:
+                seen.add(row_id)
+                results.append(rows[row_id])
+        return results
@@ -0,0 +1,758 @@
+import os
+import re
+import hashlib
+import unicodedata
+import logging
+import asyncio
+import datetime
+import itertools
+import time
+from collections import namedtuple
+from logging.handlers import RotatingFileHandler
+from dotenv import load_dotenv
+from api_client import APIClient
+from database import Database, BUCKET_COUNT, PLAN_ORDERS
+
+# Umgebungsvariablen laden
+load_dotenv()
+RCON_API_TOKEN = os.getenv("RCON_API_TOKEN")
+RCON_API_URL = os.getenv("RCON_API_URL")
+DB_FILE = os.getenv("DB_FILE", "vips.db")
+VIP_FILTERS = os.getenv("VIP_FILTERS", "").split(",")
+VIP_REGEX = re.compile(os.getenv("VIP_REGEX", r"(\S+)\s(.+)\s(\d{4}-\d{2}-\d{2}T.+)"))
+AUTO_SYNC_INTERVAL = int(os.getenv("AUTO_SYNC_INTERVAL", 24))  # In Stunden
+API_MAX_RETRIES = int(os.getenv("API_MAX_RETRIES", 3))
+API_MAX_CONCURRENCY = int(os.getenv("API_MAX_CONCURRENCY", 8))
+API_BREAKER_THRESHOLD = int(os.getenv("API_BREAKER_THRESHOLD", 5))
+API_BREAKER_TIMEOUT = float(os.getenv("API_BREAKER_TIMEOUT", 30))  # In Sekunden
+APPLY_BATCH_SIZE = 500  # Plan-Zeilen pro Batch beim Anwenden
+SNAPSHOT_KEEP = int(os.getenv("SNAPSHOT_KEEP", 100))  # Anzahl gespeicherter Hauptserver-Snapshots
+CHANGE_POLL_INTERVAL = int(os.getenv("CHANGE_POLL_INTERVAL", 0))  # In Sekunden, 0 = aus
+CHANGE_DEBOUNCE = int(os.getenv("CHANGE_DEBOUNCE", 30))  # In Sekunden
+FETCH_FRESHNESS = float(os.getenv("FETCH_FRESHNESS", 15))  # In Sekunden, 0 = Ergebnisse nicht wiederverwenden
+EXTRA_SOURCES = [name.strip() for name in os.getenv("EXTRA_SOURCES", "").split(",") if name.strip()]  # Weitere Quellserver
+VIP_CONFLICT_RULE = os.getenv("VIP_CONFLICT_RULE", "expiration").lower()  # `expiration` oder `priority`
+SOURCE_SEPARATOR = "\x1e"  # Trennt die Downloads mehrerer Quellserver im gemeinsamen Snapshot
+APPLY_RPS = float(os.getenv("APPLY_RPS", 0))  # Anfragen pro Sekunde an den Zielserver, 0 = ungedrosselt
+APPLY_TICK_SECONDS = int(os.getenv("APPLY_TICK_SECONDS", 60))  # Länge eines gedrosselten Durchlaufs
+APPLY_QUIET_HOURS = os.getenv("APPLY_QUIET_HOURS", "")  # z. B. 18:00-23:30 (lokale Zeit), leer = keine Ruhezeit
+APPLY_ORDER = os.getenv("APPLY_ORDER", "adds_first").lower()  # `adds_first` oder `expiring_first`
+APPLY_MAX_ATTEMPTS = int(os.getenv("APPLY_MAX_ATTEMPTS", 5))  # Fehlversuche je Eintrag, danach wird er verworfen
+
+if VIP_CONFLICT_RULE not in ("expiration", "priority"):
+    raise ValueError(f"Unbekannte VIP_CONFLICT_RULE: {VIP_CONFLICT_RULE} (erlaubt: expiration, priority)")
+if APPLY_ORDER not in PLAN_ORDERS:
+    raise ValueError(f"Unbekannte APPLY_ORDER: {APPLY_ORDER} (erlaubt: {', '.join(PLAN_ORDERS)})")
+for name in EXTRA_SOURCES:
+    missing = [key for key in (f"{name}_API_URL", f"{name}_API_TOKEN") if not os.getenv(key)]
+    if missing:
+        raise ValueError(f"Quellserver `{name}` aus EXTRA_SOURCES ist unvollständig konfiguriert, es fehlt: {', '.join(missing)}")
+
+def _parse_quiet_hours(value):
+    """Wandelt `HH:MM-HH:MM` in (Beginn, Ende) um; ein Fenster über Mitternacht ist erlaubt."""
+    if not value.strip():
+        return None
+    start, _, end = value.partition("-")
+    return datetime.time.fromisoformat(start.strip()), datetime.time.fromisoformat(end.strip())
+
+QUIET_HOURS = _parse_quiet_hours(APPLY_QUIET_HOURS)
+
+# Logger einrichten (Handler setzt der jeweilige Prozess über `setup_logging`)
+logger = logging.getLogger("VIPBotLogger")
+logger.setLevel(logging.INFO)
+
+def setup_logging(log_file):
+    """Hängt einen rotierenden Datei-Handler an den Logger des Prozesses."""
+    handler = RotatingFileHandler(log_file, maxBytes=5 * 1024 * 1024, backupCount=2, encoding="utf-8")
+    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+
+def log_to_file(log_message, level="INFO"):
+    """Schreibt Nachrichten mit verschiedenen Log-Levels in die Protokolldatei."""
+    if level == "INFO":
+        logger.info(log_message)
+    elif level == "DEBUG":
+        logger.debug(log_message)
+    elif level == "ERROR":
+        logger.error(log_message)
+    else:
+        logger.warning(f"Unbekanntes Log-Level: {level}. Nachricht: {log_message}")
+
+# Datenbank-Setup
+db = Database(DB_FILE)
+db.setup_tables()
+
+# Serialisiert Tabellen-Updates zwischen Jobs und Change-Watcher im selben Prozess
+pipeline_lock = asyncio.Lock()
+
+# Verhindert, dass zwei Übertragungen dieselben Plan-Einträge senden und der Plan währenddessen ersetzt wird
+apply_lock = asyncio.Lock()
+
+
+class SingleFlight:
+    """Bündelt gleichzeitige Aufrufe derselben Operation zu einer einzigen Ausführung.
+
+    Wer `run` aufruft, während die Operation mit demselben Schlüssel bereits läuft, wartet auf
+    deren Ergebnis und bekommt ab dann ihre Fortschrittsmeldungen mit. Ein erfolgreiches Ergebnis
+    wird zusätzlich `max_age` Sekunden lang an spätere Aufrufer zurückgegeben.
+    """
+
+    def __init__(self):
+        self._running = {}  # Schlüssel -> (Task, Fortschritts-Callbacks)
+        self._results = {}  # Schlüssel -> (Zeitpunkt, Ergebnis)
+
+    async def run(self, key, func, progress=None, max_age=0.0):
+        """Führt `func(progress)` aus oder schließt sich einer laufenden Ausführung an."""
+        cached = self._results.get(key)
+        if cached and time.monotonic() - cached[0] < max_age:
+            log_to_file(f"♻️ `{key}` vor {time.monotonic() - cached[0]:.0f}s abgeschlossen, Ergebnis wird wiederverwendet.", level="DEBUG")
+            await _report(progress, f"♻️ `{key}` wurde gerade erst ausgeführt, Ergebnis wird wiederverwendet.")
+            return cached[1]
+
+        if key in self._running:
+            task, listeners = self._running[key]
+            listeners.append(progress)
+            log_to_file(f"⏳ `{key}` läuft bereits, Aufruf wird angeschlossen.", level="DEBUG")
+            await _report(progress, f"⏳ `{key}` läuft bereits, das Ergebnis wird geteilt.")
+        else:
+            listeners = [progress]
+
+            async def broadcast(message):
+                for listener in list(listeners):
+                    await _report(listener, message)
+
+            task = asyncio.ensure_future(self._execute(key, func, broadcast))
+            self._running[key] = (task, listeners)
+
+        # shield: bricht ein Aufrufer ab, läuft die gemeinsame Ausführung für die anderen weiter
+        return await asyncio.shield(task)
+
+    async def _execute(self, key, func, broadcast):
+        try:
+            result = await func(broadcast)
+        finally:
+            del self._running[key]
+        if result:
+            self._results[key] = (time.monotonic(), result)
+        else:
+            self._results.pop(key, None)
+        return result
+
+    def invalidate(self):
+        """Verwirft alle zwischengespeicherten Ergebnisse (nach Änderungen am Zielserver oder an `vips`)."""
+        self._results.clear()
+
+
+# Teilt Abrufe und Synchronisationen zwischen gleichzeitigen Aufrufern (Befehle, Auto-Sync, Jobs)
+flights = SingleFlight()
+
+# API-Client für Hauptserver und Zielserver erstellen
+api_options = {
+    "max_retries": API_MAX_RETRIES,
+    "failure_threshold": API_BREAKER_THRESHOLD,
+    "reset_timeout": API_BREAKER_TIMEOUT,
+    "max_concurrency": API_MAX_CONCURRENCY,
+}
+main_api = APIClient(base_url=RCON_API_URL, token=RCON_API_TOKEN, **api_options)
+target_api = APIClient(base_url=os.getenv("TARGET_API_URL"), token=os.getenv("TARGET_API_TOKEN"), **api_options)
+
+# Quellserver in Prioritätsreihenfolge: zuerst der Hauptserver, dann EXTRA_SOURCES.
+# Jede weitere Quelle <NAME> liest <NAME>_API_URL, <NAME>_API_TOKEN und optional eigene
+# <NAME>_VIP_FILTERS / <NAME>_VIP_REGEX (Standard: VIP_FILTERS / VIP_REGEX).
+VipSource = namedtuple("VipSource", "name api filters regex")
+SOURCES = [VipSource("main", main_api, VIP_FILTERS, VIP_REGEX)]
+for name in EXTRA_SOURCES:
+    SOURCES.append(VipSource(
+        name,
+        APIClient(base_url=os.getenv(f"{name}_API_URL"), token=os.getenv(f"{name}_API_TOKEN"), **api_options),
+        os.getenv(f"{name}_VIP_FILTERS", ",".join(VIP_FILTERS)).split(","),
+        re.compile(os.getenv(f"{name}_VIP_REGEX", VIP_REGEX.pattern)),
+    ))
+SOURCES_BY_NAME = {source.name: source for source in SOURCES}
+
+# Kennung der Parser-Einstellungen; ändert sie sich, wird ein identischer Download trotzdem neu eingelesen
+parser_settings = VIP_FILTERS + [VIP_REGEX.pattern]
+if EXTRA_SOURCES:
+    parser_settings = [VIP_CONFLICT_RULE] + [
+        f"{source.name}:{','.join(source.filters)}:{source.regex.pattern}" for source in SOURCES
+    ]
+PARSER_KEY = hashlib.sha256("\n".join(parser_settings).encode("utf-8")).hexdigest()
+
+async def close_api_clients():
+    """Schließt die HTTP-Sessions aller Quellserver und des Zielservers."""
+    for api in [source.api for source in SOURCES] + [target_api]:
+        await api.close()
+
+
+async def _report(progress, message):
+    """Gibt eine Fortschrittsmeldung an den Aufrufer weiter, falls ein Callback gesetzt ist."""
+    if progress:
+        await progress(message)
+
+def parse_vip_list(raw_text, filters=VIP_FILTERS, regex=VIP_REGEX):
+    """Normalisiert eine heruntergeladene VIP-Liste und wendet Filter und Regex an."""
+    raw_data = unicodedata.normalize("NFKC", raw_text.strip())
+    lines = raw_data.split("\n")
+
+    filtered_lines = [line for line in lines if any(filter_term in line for filter_term in filters)]
+    return [
+        re.match(regex, line).groups() for line in filtered_lines if re.match(regex, line)
+    ]
+
+def _expiration_key(expiration):
+    """Sortierschlüssel für Ablaufdaten; nicht lesbare Daten gelten als am frühesten abgelaufen."""
+    try:
+        parsed = datetime.datetime.fromisoformat(expiration)
+    except (TypeError, ValueError):
+        return datetime.datetime.min.replace(tzinfo=datetime.timezone.utc)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+    return parsed
+
+def merge_vip_lists(vip_lists):
+    """Führt die VIP-Listen mehrerer Quellserver (in Prioritätsreihenfolge) zusammen.
+
+    Steht eine `player_id` in mehreren Listen, gewinnt bei `expiration` das späteste Ablaufdatum
+    (bei Gleichstand die höhere Priorität), bei `priority` immer die erste Quelle.
+    """
+    merged = {}
+    for vips in vip_lists:
+        for row in vips:
+            current = merged.get(row[0])
+            if current is None:
+                merged[row[0]] = row
+            elif VIP_CONFLICT_RULE == "expiration" and _expiration_key(row[2]) > _expiration_key(current[2]):
+                merged[row[0]] = row
+    return list(merged.values())
+
+def parse_main_snapshot(raw_text):
+    """Wertet einen Hauptserver-Snapshot aus: eine einzelne VIP-Liste oder die Downloads mehrerer Quellserver."""
+    if not raw_text.startswith(SOURCE_SEPARATOR):
+        return parse_vip_list(raw_text)
+
+    sections = dict(chunk.partition("\n")[::2] for chunk in raw_text.split(SOURCE_SEPARATOR)[1:])
+    return merge_vip_lists(
+        parse_vip_list(sections[source.name], source.filters, source.regex)
+        for source in SOURCES if source.name in sections
+    )
+
+async def fetch_main_raw():
+    """Lädt die VIP-Listen aller Quellserver gleichzeitig und gibt sie als einen Snapshot-Text zurück.
+
+    Mit nur einem Quellserver ist das dessen unveränderte Antwort. Fehlt die Antwort eines Servers,
+    wird None zurückgegeben, damit dessen VIPs nicht als entfernt gelten. Gleichzeitige Aufrufe
+    (`!update_vips`, Change-Watcher, Sync) teilen sich einen Download.
+    """
+    return await flights.run("main", _fetch_main_raw)
+
+async def _fetch_main_raw(progress=None):
+    raw_texts = await asyncio.gather(*(source.api.get("/api/download_vips") for source in SOURCES))
+    for source, raw_text in zip(SOURCES, raw_texts):
+        if raw_text is None:
+            log_to_file(f"Fehler beim Abrufen der VIPs von Quellserver `{source.name}`.", level="ERROR")
+            return None
+
+    if len(SOURCES) == 1:
+        return raw_texts[0]
+    return "".join(f"{SOURCE_SEPARATOR}{source.name}\n{raw_text}" for source, raw_text in zip(SOURCES, raw_texts))
+
+async def fetch_vip_list(api):
+    """Lädt die VIP-Liste eines Servers über den APIClient (mit Retry und Circuit Breaker)."""
+    raw_text = await api.get("/api/download_vips")
+    if raw_text is None:
+        return None
+    return parse_vip_list(raw_text)
+
+def ingest_main_snapshot(raw_text):
+    """Speichert die Rohantwort des Hauptservers als Snapshot und aktualisiert `vips` samt Change-Feed.
+
+    Identische Downloads werden nicht erneut eingelesen, solange `vips` noch dem letzten Snapshot entspricht.
+    Gibt die ID des aktuellen Snapshots zurück.
+    """
+    blob_hash = db.store_blob(raw_text.encode("utf-8"))
+    latest = db.latest_snapshot("main")
+    if latest:
+        snapshot_id, latest_blob, parser_key, _, parsed_hash = latest
+        if latest_blob == blob_hash and parser_key == PARSER_KEY and parsed_hash == db.content_hash("vips"):
+            db.touch_snapshot(snapshot_id)
+            log_to_file(f"VIP-Liste vom Hauptserver unverändert (Snapshot #{snapshot_id}).", level="DEBUG")
+            return snapshot_id
+
+    snapshot_id = db.ingest_snapshot("main", blob_hash, PARSER_KEY, "vips", parse_main_snapshot(raw_text))
+    db.prune_snapshots("main", SNAPSHOT_KEEP)
+    log_to_file(f"Snapshot #{snapshot_id} vom Hauptserver gespeichert ({len(db.fetch_changes(snapshot_id))} Änderungen).", level="INFO")
+    return snapshot_id
+
+async def update_vip_tables(progress=None, max_age=FETCH_FRESHNESS):
+    """Aktualisiert die VIP-Datenbank für Hauptserver und Zielserver.
+
+    Gleichzeitige Aufrufe teilen sich einen Abruf; ein Ergebnis, das jünger als `max_age` Sekunden ist,
+    wird ohne neuen Abruf wiederverwendet.
+    """
+    return await flights.run("update", _update_vip_tables, progress, max_age)
+
+async def _update_vip_tables(progress=None):
+    try:
+        # **VIPs von Haupt- und Zielserver gleichzeitig abrufen**
+        raw_main, target_parsed_vips = await asyncio.gather(
+            fetch_main_raw(), fetch_vip_list(target_api)
+        )
+
+        if raw_main is None:
+            log_to_file("Fehler beim Abrufen der VIPs vom Hauptserver.", level="ERROR")
+            await _report(progress, "❌ Fehler beim Abrufen der VIPs vom Hauptserver.")
+            return False
+
+        # **Hauptserver-Tabelle aktualisieren (Snapshot + Change-Feed)**
+        ingest_main_snapshot(raw_main)
+        log_to_file("VIP-Datenbank vom Hauptserver wurde aktualisiert.", level="INFO")
+
+        if target_parsed_vips is None:
+            log_to_file("Fehler beim Abrufen der VIPs vom Zielserver.", level="ERROR")
+            await _report(progress, "❌ Fehler beim Abrufen der VIPs vom Zielserver.")
+            return False
+
+        # **Zielserver-Tabelle aktualisieren (receiver_vips)**
+        db.replace_table("receiver_vips", target_parsed_vips)
+        log_to_file("VIP-Datenbank vom Zielserver (receiver_vips) wurde aktualisiert.", level="INFO")
+
+        return True
+    except Exception as e:
+        log_to_file(f"Fehler beim Aktualisieren der VIP-Daten: {str(e)}", level="ERROR")
+        await _report(progress, f"❌ Fehler beim Aktualisieren der VIP-Daten: {str(e)}")
+        return False
+
+async def _remove_vip(player_id, *_):
+    """Entfernt einen VIP auf dem Zielserver. Gibt True bei Erfolg zurück."""
+    if not target_api.available:
+        return False
+    result = await target_api.post("/api/remove_vip", {"player_id": player_id})
+    if result is not None:
+        log_to_file(f"✅ VIP entfernt: {player_id}")
+    else:
+        log_to_file(f"❌ Fehler beim Entfernen von VIP {player_id}", level="ERROR")
+    return result is not None
+
+async def _add_vip(player_id, description, expiration, *_):
+    """Fügt einen VIP auf dem Zielserver hinzu. Gibt True bei Erfolg zurück."""
+    if not target_api.available:
+        return False
+    result = await target_api.post("/api/add_vip", {"player_id": player_id, "description": description, "expiration": expiration})
+    if result is not None:
+        log_to_file(f"✅ VIP hinzugefügt: {player_id} - {description} - {expiration}")
+    else:
+        log_to_file(f"❌ Fehler beim Hinzufügen von VIP {player_id}", level="ERROR")
+    return result is not None
+
+async def _send_batch(send, batch):
+    """Sendet einen Batch über so viele Worker, wie der Host gleichzeitig zulässt.
+
+    Öffnet der Circuit Breaker, nehmen die Worker keine weiteren Zeilen mehr an; nicht gesendete
+    Zeilen zählen weder als erfolgreich noch als fehlgeschlagen. Gibt (erfolgreich, fehlgeschlagen) zurück.
+    """
+    rows = iter(batch)
+    results = []
+
+    async def worker():
+        for row in rows:
+            if not target_api.available:
+                return
+            results.append(await send(*row))
+
+    workers = min(len(batch), target_api.host_state.limiter.maximum)
+    await asyncio.gather(*(worker() for _ in range(workers)))
+    return sum(results), len(results) - sum(results)
+
+async def push_vip_changes(to_remove, to_add, progress=None):
+    """Sendet Entfernungen und Hinzufügungen an den Zielserver.
+
+    Beide Eingaben sind Iterables von Plan-Zeilen (player_id, description, expiration, ...)
+    und werden in Batches gestreamt. Innerhalb eines Batches laufen die Anfragen parallel,
+    begrenzt durch das adaptive Limit des APIClients (siehe `_send_batch`). Erst werden alle Entfernungen
+    abgeschlossen, dann die Hinzufügungen, damit Aktualisierungen (entfernen + neu
+    hinzufügen) nicht kollidieren. Öffnet der Circuit Breaker, wird der Lauf abgebrochen.
+    Gibt (hinzugefügt, entfernt, fehlgeschlagen) zurück.
+    """
+    add = _add_vip
+    remove = _remove_vip
+    counts = {remove: 0, add: 0}
+    failed_count = 0
+    for rows, send in ((to_remove, remove), (to_add, add)):
+        rows = iter(rows)
+        while target_api.available:
+            batch = list(itertools.islice(rows, APPLY_BATCH_SIZE))
+            if not batch:
+                break
+            succeeded, failed = await _send_batch(send, batch)
+            counts[send] += succeeded
+            failed_count += failed
+            await _report(progress, f"📤 {counts[add] + counts[remove] + failed_count} Anfragen an den Zielserver gesendet.")
+
+    if not target_api.available:
+        log_to_file("⛔ Zielserver nicht erreichbar (Circuit Breaker offen), Synchronisation abgebrochen.", level="ERROR")
+
+    # Der Zielserver hat sich geändert: zwischengespeicherte Abrufe und Pläne sind veraltet
+    flights.invalidate()
+    return counts[add], counts[remove], failed_count
+
+def _plan_from_change_feed():
+    """Leitet den Sync-Plan aus dem Change-Feed ab, wenn das möglich ist, sonst None.
+
+    Das gilt, wenn `vips` noch dem letzten Snapshot entspricht und `receiver_vips` genau
+    dem Stand davor: Dann sind die Änderungen des Snapshots exakt die Differenz zum Ziel.
+    """
+    latest = db.latest_snapshot("main")
+    if not latest:
+        return None
+    snapshot_id, _, _, base_hash, parsed_hash = latest
+    if parsed_hash != db.content_hash("vips") or base_hash != db.content_hash("receiver_vips"):
+        return None
+
+    actions = {"added": "add", "removed": "remove", "changed": "update"}
+    log_to_file(f"Sync-Plan aus dem Change-Feed von Snapshot #{snapshot_id} abgeleitet.", level="INFO")
+    return [
+        (player_id, description, expiration, actions[change])
+        for player_id, change, description, expiration in db.fetch_changes(snapshot_id)
+    ]
+
+def build_sync_plan():
+    """Vergleicht `vips` mit `receiver_vips` und speichert das Ergebnis als versionierten Sync-Plan.
+
+    Ohne passenden Change-Feed läuft ein Merge-Join über beide Tabellen (`Database.iter_diff`),
+    dessen Ergebnis direkt in Batches in `sync` geschrieben wird. Gibt die Anzahl je Aktion zurück.
+    """
+    source_hash = db.content_hash("vips")
+    target_hash = db.content_hash("receiver_vips")
+    if source_hash == target_hash:
+        plan = []
+        log_to_file("Hauptserver und Zielserver sind identisch, keine Änderungen.", level="INFO")
+    else:
+        plan = _plan_from_change_feed()
+        if plan is None:
+            plan = db.iter_diff("vips", "receiver_vips")
+
+    counts = db.save_sync_plan(plan, source_hash, target_hash)
+
+    log_to_file(f"{counts['add']} VIPs zur `sync`-Tabelle hinzugefügt.", level="INFO")
+    log_to_file(f"{counts['remove']} VIPs zur Entfernung in `sync` gespeichert.", level="INFO")
+    log_to_file(f"{counts['update']} VIPs mit aktualisiertem Ablaufdatum oder Namen gespeichert.", level="INFO")
+    return counts
+
+async def apply_sync_plan(progress=None):
+    """Streamt den gespeicherten Sync-Plan an den Zielserver, ohne die Unterschiede neu zu berechnen.
+
+    Updates werden als Entfernen + Hinzufügen übertragen. Der Plan wird nur verworfen, wenn der
+    Lauf nicht durch den Circuit Breaker abgebrochen wurde und der Plan noch derselbe ist.
+    Ein zweiter gleichzeitiger Aufruf wartet und findet danach keinen offenen Plan mehr vor.
+    """
+    async with apply_lock:
+        plan = db.get_sync_plan()
+        added_count, removed_count, failed_count = await push_vip_changes(
+            db.iter_sync_plan("remove", "update"), db.iter_sync_plan("add", "update"), progress
+        )
+        completed = target_api.available
+        if completed and db.get_sync_plan() == plan:
+            db.delete_all("sync")
+        elif completed:
+            log_to_file("Sync-Plan wurde während der Übertragung ersetzt, der neue Plan bleibt erhalten.", level="INFO")
+    return added_count, removed_count, failed_count, completed
+
+def in_quiet_hours(now=None):
+    """True, solange die Ruhezeit APPLY_QUIET_HOURS (lokale Zeit) läuft."""
+    if QUIET_HOURS is None:
+        return False
+    now = (now or datetime.datetime.now()).time()
+    start, end = QUIET_HOURS
+    if start <= end:
+        return start <= now < end
+    return now >= start or now < end
+
+def _plan_requests(counts):
+    """Anzahl der Anfragen für einen Plan; Aktualisierungen brauchen zwei (entfernen + hinzufügen)."""
+    return counts["add"] + counts["remove"] + 2 * counts["update"]
+
+async def apply_paced_tick(progress=None):
+    """Überträgt einen Teil des Sync-Plans mit höchstens APPLY_RPS Anfragen pro Sekunde.
+
+    Ein Durchlauf sendet bis zu APPLY_RPS * APPLY_TICK_SECONDS Anfragen nacheinander in der
+    Reihenfolge APPLY_ORDER und endet vorzeitig bei Beginn der Ruhezeit oder offenem Circuit
+    Breaker. Abgearbeitete Einträge verlassen den Plan sofort, der Rest folgt in den nächsten
+    Durchläufen. Gibt (hinzugefügt, entfernt, fehlgeschlagen, verbleibend) zurück, oder None,
+    wenn nichts gesendet wurde.
+    """
+    async with apply_lock:
+        if in_quiet_hours() or not target_api.available:
+            return None
+        if db.is_sync_plan_stale():
+            log_to_file("⚠️ Gedrosselte Übertragung angehalten: Sync-Plan veraltet. `!sync_vips` erneut ausführen.", level="ERROR")
+            await _report(progress, "⚠️ Gedrosselte Übertragung angehalten: Der Sync-Plan ist veraltet. `!sync_vips` erneut ausführen.")
+            return None
+
+        budget = max(1, int(APPLY_RPS * APPLY_TICK_SECONDS))
+        plan = db.get_sync_plan()
+        rows = db.fetch_sync_plan_batch(APPLY_ORDER, budget)
+        if not rows:
+            return None
+
+        loop = asyncio.get_running_loop()
+        next_send = loop.time()
+        steps = {"add": (_add_vip,), "remove": (_remove_vip,), "update": (_remove_vip, _add_vip)}
+        done = []
+        failed = []
+        counts = {_add_vip: 0, _remove_vip: 0}
+        requests = 0
+        for row in rows:
+            if (requests and requests + len(steps[row[3]]) > budget) or in_quiet_hours():
+                break
+            results = []
+            for send in steps[row[3]]:
+                await asyncio.sleep(max(0.0, next_send - loop.time()))
+                next_send = loop.time() + 1 / APPLY_RPS
+                result = await send(*row)
+                counts[send] += result
+                results.append(result)
+                requests += 1
+            if not target_api.available:
+                break  # Eintrag bleibt im Plan und wird später erneut versucht
+            if all(results):
+                done.append(row)
+            else:
+                # Aktualisierung mit erfolgreichem Entfernen: nur das Hinzufügen ist noch offen
+                failed.append((row, "add" if row[3] == "update" and results[0] else row[3]))
+
+        flights.invalidate()
+        if db.get_sync_plan() == plan:
+            dropped = db.advance_sync_plan(done, failed, APPLY_MAX_ATTEMPTS)
+            if dropped:
+                log_to_file(f"⚠️ {dropped} Einträge nach {APPLY_MAX_ATTEMPTS} Fehlversuchen aus dem Sync-Plan verworfen.", level="ERROR")
+                await _report(progress, f"⚠️ {dropped} Einträge nach {APPLY_MAX_ATTEMPTS} Fehlversuchen verworfen; die nächste Synchronisation korrigiert sie.")
+        else:
+            log_to_file("Sync-Plan wurde während der gedrosselten Übertragung ersetzt, Rest-Plan bleibt unverändert.", level="INFO")
+
+        remaining = _plan_requests(db.sync_plan_counts())
+        if not remaining:
+            db.delete_all("sync")
+        added_count, removed_count = counts[_add_vip], counts[_remove_vip]
+        log_to_file(f"🐢 Gedrosselte Übertragung: {added_count} hinzugefügt, {removed_count} entfernt, {len(failed)} fehlgeschlagen, {remaining} Anfragen verbleibend.", level="INFO")
+        await _report(progress, f"🐢 Gedrosselte Übertragung: {added_count} hinzugefügt, {removed_count} entfernt, {len(failed)} fehlgeschlagen, {remaining} Anfragen verbleibend.")
+        if not target_api.available:
+            await _report(progress, "⛔ Zielserver nicht erreichbar, die Übertragung wird im nächsten Durchlauf fortgesetzt.")
+        return added_count, removed_count, len(failed), remaining
+
+async def run_paced_apply(tick=None):
+    """Arbeitet einen offenen Sync-Plan in Durchläufen von APPLY_TICK_SECONDS Sekunden ab.
+
+    `tick()` führt einen Durchlauf aus (Standard: `apply_paced_tick`). Während der Ruhezeit,
+    ohne offenen oder mit veraltetem Plan wird nur gewartet.
+    """
+    tick = tick or apply_paced_tick
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        try:
+            if (sum(db.sync_plan_counts().values()) and not in_quiet_hours()
+                    and target_api.available and not db.is_sync_plan_stale()):
+                await tick()
+        except Exception as e:
+            log_to_file(f"Fehler bei der gedrosselten Übertragung: {str(e)}", level="ERROR")
+        await asyncio.sleep(max(1.0, APPLY_TICK_SECONDS - (loop.time() - started)))
+
+def paced_apply_status(local_breaker=True):
+    """Stand der Übertragung: offene Einträge je Aktion, Anfragen, geschätzte Dauer und Ruhezeit.
+
+    Der Circuit Breaker gilt nur im eigenen Prozess. Überträgt ein anderer Prozess (Sync-Worker),
+    ist `local_breaker=False` zu setzen; `available` ist dann None (unbekannt).
+    """
+    counts = db.sync_plan_counts()
+    requests = _plan_requests(counts)
+    return {
+        "counts": counts,
+        "requests": requests,
+        "eta_seconds": requests / APPLY_RPS if APPLY_RPS else None,
+        "quiet": in_quiet_hours(),
+        "stale": bool(requests) and db.is_sync_plan_stale(),
+        "available": target_api.available if local_breaker else None,
+    }
+
+async def sync_task(progress=None, max_age=FETCH_FRESHNESS):
+    """Lädt beide VIP-Listen und berechnet einen neuen Sync-Plan. Gibt True bei Erfolg zurück.
+
+    Wie bei `update_vip_tables` teilen sich gleichzeitige Aufrufe eine Ausführung.
+    """
+    return await flights.run("sync", _sync_task, progress, max_age)
+
+async def _sync_task(progress=None):
+    try:
+        # Erst nach einer laufenden Übertragung: Zielserver-Stand lesen und Plan ersetzen
+        async with apply_lock:
+            if not await update_vip_tables(progress):
+                return False
+            counts = build_sync_plan()
+        await _report(progress, f"✅ Sync-Plan erstellt: {counts['add']} hinzufügen, {counts['remove']} entfernen, {counts['update']} aktualisieren.")
+        return True
+
+    except Exception as e:
+        log_to_file(f"Fehler bei der Synchronisation: {str(e)}", level="ERROR")
+        await _report(progress, f"❌ Fehler bei der Synchronisation: {str(e)}")
+        return False
+
+async def apply_task(progress=None):
+    """Wendet den gespeicherten Sync-Plan an und meldet das Ergebnis. Gibt True bei Erfolg zurück."""
+    try:
+        counts = db.sync_plan_counts()
+        if not sum(counts.values()):
+            log_to_file("ℹ️ Keine Änderungen in `sync` gespeichert. `!sync_vips` zuerst ausführen.", level="INFO")
+            await _report(progress, "ℹ️ Keine Änderungen in `sync` gespeichert. `!sync_vips` zuerst ausführen.")
+            return False
+
+        if db.is_sync_plan_stale():
+            log_to_file("⚠️ Der Sync-Plan ist veraltet (VIP-Listen haben sich geändert). `!sync_vips` erneut ausführen.", level="ERROR")
+            await _report(progress, "⚠️ Der Sync-Plan ist veraltet (VIP-Listen haben sich geändert). `!sync_vips` erneut ausführen.")
+            return False
+
+        log_to_file(f"📋 Geplante Änderungen aus `sync`: {counts}", level="INFO")
+
+        if APPLY_RPS:
+            return await start_paced_apply(progress)
+
+        added_count, removed_count, failed_count, completed = await apply_sync_plan(progress)
+
+        if not completed:
+            await _report(progress, f"⛔ Zielserver nicht erreichbar, Synchronisation abgebrochen: {added_count} hinzugefügt, {removed_count} entfernt.")
+            return False
+
+        log_to_file(f"✅ Synchronisation abgeschlossen: {added_count} hinzugefügt, {removed_count} entfernt, {failed_count} fehlgeschlagen.", level="INFO")
+        await _report(progress, f"✅ Synchronisation abgeschlossen: {added_count} hinzugefügt, {removed_count} entfernt, {failed_count} fehlgeschlagen.")
+        return True
+
+    except Exception as e:
+        log_to_file(f"❌ Fehler bei der Synchronisation: {str(e)}", level="ERROR")
+        await _report(progress, f"❌ Fehler bei der Synchronisation: {str(e)}")
+        return False
+
+async def start_paced_apply(progress=None):
+    """Startet die gedrosselte Übertragung mit einem ersten Durchlauf; den Rest übernimmt `run_paced_apply`."""
+    if in_quiet_hours():
+        log_to_file(f"🌙 Ruhezeit ({APPLY_QUIET_HOURS}), Übertragung beginnt danach automatisch.", level="INFO")
+        await _report(progress, f"🌙 Ruhezeit ({APPLY_QUIET_HOURS}): Die Übertragung beginnt danach automatisch.")
+        return True
+
+    result = await apply_paced_tick(progress)
+    if result is None:
+        return False
+    if result[3]:
+        await _report(progress, f"⏳ Rest wird mit {APPLY_RPS:g} Anfragen/s im Hintergrund übertragen. Stand: `!apply_status`.")
+    return target_api.available
+
+async def apply_changes_since(snapshot_id, progress=None):
+    """Überträgt nur die VIPs an den Zielserver, die sich seit `snapshot_id` auf dem Hauptserver geändert haben.
+
+    Jede geänderte `player_id` wird gegen `receiver_vips` geprüft (Index-Lookup statt Komplettvergleich).
+    Nach dem Lauf wird `receiver_vips` nachgeführt; Abweichungen durch fehlgeschlagene Anfragen
+    korrigiert die nächste vollständige Synchronisation. Gibt True zurück, wenn der Lauf nicht
+    durch den Circuit Breaker abgebrochen wurde.
+    """
+    to_add = []
+    to_remove = []
+    to_update = []
+    for player_id in db.changed_player_ids_since("main", snapshot_id):
+        source = db.fetch_vip("vips", player_id)
+        target = db.fetch_vip("receiver_vips", player_id)
+        if source is None:
+            if target is not None:  # sonst innerhalb der Ruhephase hinzugefügt und wieder entfernt
+                to_remove.append(target)
+        elif target is None:
+            to_add.append(source)
+        elif target != source:
+            to_update.append(source)
+
+    if not (to_add or to_remove or to_update):
+        return True
+
+    log_to_file(f"⚡ Änderungen erkannt: {len(to_add)} hinzufügen, {len(to_remove)} entfernen, {len(to_update)} aktualisieren.", level="INFO")
+    await _report(progress, f"⚡ Änderungen auf dem Hauptserver: {len(to_add)} hinzufügen, {len(to_remove)} entfernen, {len(to_update)} aktualisieren.")
+
+    added_count, removed_count, failed_count = await push_vip_changes(to_remove + to_update, to_add + to_update)
+    if not target_api.available:
+        await _report(progress, "⛔ Zielserver nicht erreichbar, Änderungen werden beim nächsten Durchlauf erneut versucht.")
+        return False
+
+    db.apply_to_table("receiver_vips", to_add + to_update, [row[0] for row in to_remove])
+    log_to_file(f"⚡ Änderungen übertragen: {added_count} hinzugefügt, {removed_count} entfernt, {failed_count} fehlgeschlagen.", level="INFO")
+    await _report(progress, f"✅ Änderungen übertragen: {added_count} hinzugefügt, {removed_count} entfernt, {failed_count} fehlgeschlagen.")
+    return True
+
+async def watch_main_changes(trigger=None):
+    """Prüft die VIP-Liste des Hauptservers alle CHANGE_POLL_INTERVAL Sekunden auf Änderungen.
+
+    Der Abgleich ist günstig: Ein unveränderter Download wird nur gehasht und mit dem letzten
+    Snapshot verglichen. Nach einer Änderung wird in CHANGE_DEBOUNCE-Abständen weiter geprüft,
+    bis die Liste stabil ist; erst dann überträgt `trigger(snapshot_id)` alle gesammelten
+    Änderungen auf einmal (Standard: `apply_changes_since`).
+    """
+    trigger = trigger or apply_changes_since
+    latest = db.latest_snapshot("main")
+    marker = latest[0] if latest else 0  # Stand, bis zu dem der Zielserver nachgeführt ist
+    last_seen = marker  # Zuletzt gesehener Snapshot, für die Ruhephase
+
+    while True:
+        await asyncio.sleep(CHANGE_DEBOUNCE if last_seen != marker else CHANGE_POLL_INTERVAL)
+        try:
+            raw_text = await fetch_main_raw()
+            if raw_text is None:
+                continue
+
+            async with pipeline_lock:
+                # Auch Änderungen, die ein anderer Pfad (z. B. `!sync_vips`) schon eingelesen hat, zählen
+                snapshot_id = ingest_main_snapshot(raw_text)
+                if snapshot_id != last_seen:
+                    last_seen = snapshot_id  # Liste hat sich geändert, auf Ruhe warten
+                    flights.invalidate()
+                    continue
+                if snapshot_id == marker or in_quiet_hours():
+                    continue
+
+                if await trigger(marker):
+                    marker = snapshot_id
+        except Exception as e:
+            log_to_file(f"Fehler beim Prüfen auf VIP-Änderungen: {str(e)}", level="ERROR")
+
+async def verify_target(progress=None):
+    """Lädt die VIP-Liste des Zielservers neu und prüft per Bucket-Hash-Vergleich, ob sie `vips` entspricht.
+
+    Gibt die Liste der abweichenden Buckets zurück (leer = konvergiert) oder None bei einem Abruffehler.
+    """
+    target_parsed_vips = await fetch_vip_list(target_api)
+    if target_parsed_vips is None:
+        log_to_file("Fehler beim Abrufen der VIPs vom Zielserver.", level="ERROR")
+        await _report(progress, "❌ Fehler beim Abrufen der VIPs vom Zielserver.")
+        return None
+
+    db.replace_table("receiver_vips", target_parsed_vips)
+    buckets = db.diff_buckets("vips", "receiver_vips")
+    if buckets:
+        log_to_file(f"⚠️ Zielserver weicht in {len(buckets)} von {BUCKET_COUNT} Buckets ab: {buckets}", level="ERROR")
+        await _report(progress, f"⚠️ Zielserver weicht in {len(buckets)} von {BUCKET_COUNT} Buckets ab. `!sync_vips` ausführen, um die Unterschiede zu planen.")
+    else:
+        log_to_file("✅ Zielserver stimmt mit dem Hauptserver überein.", level="INFO")
+        await _report(progress, "✅ Zielserver stimmt mit dem Hauptserver überein (alle Bucket-Hashes gleich).")
+    return buckets
+
+async def run_job(kind, progress=None):
+    """Führt einen Job der Warteschlange aus (`update`, `sync`, `apply`, `verify` oder `auto`).
+
+    `auto` führt nur den Sync aus; der Worker reiht das Apply danach als eigenen Job ein,
+    damit der Bot den Sync-Report vorher aus dem noch vorhandenen Plan senden kann.
+    """
+    if kind == "update":
+        return await update_vip_tables(progress)
+    if kind == "sync":
+        return await sync_task(progress)
+    if kind == "apply":
+        return await apply_task(progress)
+    if kind == "verify":
+        return await verify_target(progress) == []
+    if kind == "auto":
+        return await sync_task(progress)
+    raise ValueError(f"Unbekannter Job-Typ: {kind}")